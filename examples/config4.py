@@ -1,4 +1,4 @@
-from magiconfig import MagiConfig
+from magiconfig import MagiConfig, LazyMagiConfig
 
 # common settings
 common = MagiConfig()
@@ -6,9 +6,13 @@ common.foo = "foo"
 common.bar = 3.0
 
 # generate new configs for each input
-config = MagiConfig()
-for input in ["a","b","c"]:
-    setattr(config,input,MagiConfig())
-    cfg = getattr(config,input)
+# (only the config selected by the script is actually built)
+def make_config(input):
+    cfg = MagiConfig()
     cfg.input = input
     cfg.join(common)
+    return cfg
+
+config = MagiConfig()
+for input in ["a","b","c"]:
+    setattr(config,input,LazyMagiConfig(make_config,input))
@@ -1,11 +1,36 @@
 import argparse
-import sys, os, imp, uuid
-import six
+import sys, os
 import collections
-from six.moves.collections_abc import Sized, Iterable, Container, Mapping
 import functools
 import types
 import warnings
+import time
+import weakref
+
+# python 2 compatibility (six is only needed for python 2)
+# modules only needed for some features are imported where they are used, to keep "import magiconfig" fast
+_PY2 = sys.version_info[0]==2
+if _PY2:
+    import six, imp
+    from six.moves.collections_abc import Sized, Iterable, Container, Mapping
+    from thread import allocate_lock as _allocate_lock, _local
+    _iteritems = six.iteritems
+    _itervalues = six.itervalues
+    _range = six.moves.range
+    _string_types = six.string_types
+    _integer_types = six.integer_types
+    _text_type = six.text_type
+    _binary_type = six.binary_type
+else:
+    from collections.abc import Sized, Iterable, Container, Mapping
+    from _thread import allocate_lock as _allocate_lock, _local
+    def _iteritems(d): return iter(d.items())
+    def _itervalues(d): return iter(d.values())
+    _range = range
+    _string_types = (str,)
+    _integer_types = (int,)
+    _text_type = str
+    _binary_type = bytes
 
 __version__ = "2.4.4"
 
@@ -39,17 +64,386 @@ def deprecation(message):
     warnings.warn(message, VisibleDeprecationWarning, stacklevel=2)
 
 # from https://stackoverflow.com/questions/31174295/getattr-and-setattr-on-nested-subobjects-chained-properties/31174427#31174427
+# (extended to build lazy configs on demand)
 def _rgetattr(obj, attr, *args):
     def _getattr(obj, attr):
+        if isinstance(obj, LazyMagiConfig): obj = obj.resolve()
         return getattr(obj, attr, *args)
-    return functools.reduce(_getattr, [obj] + attr.split('.'))
+    result = functools.reduce(_getattr, [obj] + attr.split('.'))
+    if isinstance(result, LazyMagiConfig): result = result.resolve()
+    return result
 
 # denotes MagiConfig-specific errors
 class MagiConfigError(Exception):
     pass
 
+ConfigCacheInfo = collections.namedtuple("ConfigCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# process-wide LRU cache of imported config objects (disabled by default, see set_config_cache_size())
+# keyed on (absolute path, mtime, size, obj), so any change to the file results in a new import
+class _ConfigCache(object):
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = _allocate_lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                # move to most recently used position
+                val = self._entries.pop(key)
+                self._entries[key] = val
+                return val
+            self.misses += 1
+            return default
+
+    def put(self, key, val):
+        with self._lock:
+            if self.maxsize<=0: return
+            self._entries.pop(key, None)
+            self._entries[key] = val
+            while len(self._entries)>self.maxsize:
+                self._entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries)>max(self.maxsize,0):
+                self._entries.popitem(last=False)
+
+    # remove all entries for a file
+    def evict(self, path):
+        with self._lock:
+            for key in [key for key in self._entries if key[0]==path]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return ConfigCacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+_config_cache = _ConfigCache()
+_missing = object()
+_unknown_dest = object()
+_schema_key = object()
+
+# source file of this module (never tracked as a config file)
+_module_file = os.path.abspath(__file__[:-1] if __file__.endswith((".pyc",".pyo")) else __file__)
+
+# atomic rename (os.replace not available in python2)
+_replace_file = getattr(os, "replace", os.rename)
+
+# unique temporary file next to path (renamed to path once complete), so concurrent writers do not clobber each other
+def _tmp_name(path):
+    import uuid
+    return "{}.{}.tmp".format(path, uuid.uuid4().hex)
+
+def clear_config_cache():
+    _config_cache.clear()
+
+def config_cache_info():
+    return _config_cache.info()
+
+# maxsize = 0 disables the cache (default)
+# (namespaces parsed from the same cached config share its mutable values)
+def set_config_cache_size(maxsize):
+    _config_cache.resize(maxsize)
+
+# by default, config modules are removed from sys.modules once executed
+_retain_config_modules = False
+
+# retain = True keeps each executed config module registered in sys.modules (legacy behavior)
+def set_config_module_retention(retain):
+    global _retain_config_modules
+    _retain_config_modules = retain
+
+# optional directory for compiled config bytecode
+# (otherwise, the standard __pycache__ next to the config file is used, if writable)
+_bytecode_cache_dir = os.environ.get("MAGICONFIG_BYTECODE_CACHE", None)
+
+def set_config_bytecode_cache(directory):
+    global _bytecode_cache_dir
+    _bytecode_cache_dir = directory
+
+# thread pool used by the asyncio interface (created on first use)
+# max_workers = None uses the default size from concurrent.futures
+_async_concurrency = None
+_async_executor = None
+_async_lock = _allocate_lock()
+
+def set_async_concurrency(max_workers):
+    global _async_concurrency, _async_executor
+    with _async_lock:
+        executor = _async_executor
+        _async_concurrency = max_workers
+        _async_executor = None
+    # calls that were already submitted still finish
+    if executor is not None: executor.shutdown(wait=False)
+
+def _get_async_executor():
+    global _async_executor
+    with _async_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _async_executor = ThreadPoolExecutor(max_workers=_async_concurrency)
+        return _async_executor
+
+# run func in the thread pool; returns an asyncio future (cancelling it cancels the call if it has not started)
+def _run_async(func, *args):
+    import asyncio
+    # running loop if called from a coroutine, otherwise the current event loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.get_event_loop()
+    return loop.run_in_executor(_get_async_executor(), functools.partial(func, *args))
+
+# optional per-phase timing of parse_known_args() and parse_config()
+# MAGICONFIG_PROFILE (any value except "" or "0") enables profiling and prints each report to stderr
+_profile_env = os.environ.get("MAGICONFIG_PROFILE", "") not in ("", "0")
+_profile_enabled = _profile_env
+_profile_report = _profile_env
+_profile_local = _local()
+_clock = getattr(time, "perf_counter", time.time)
+
+def set_profiling(enabled, report=False):
+    global _profile_enabled, _profile_report
+    _profile_enabled = enabled
+    _profile_report = report
+
+# stats from the most recent parse in the current thread (None if profiling was not enabled)
+def get_parse_stats():
+    return getattr(_profile_local, "last", None)
+
+class ParseStats(object):
+    # times: phase:seconds, counts: name:count (in order of first use)
+    def __init__(self):
+        self.times = _odict()
+        self.counts = _odict()
+        self.total = 0.0
+        self._start = self._last = _clock()
+
+    # attribute time since the previous phase ended to this phase
+    def lap(self, phase):
+        now = _clock()
+        self.times[phase] = self.times.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def __repr__(self):
+        lines = ["total: {:.6f} s".format(self.total)]
+        lines.extend("  {}: {:.6f} s".format(phase, t) for phase,t in _iteritems(self.times))
+        lines.extend("  {}: {}".format(name, n) for name,n in _iteritems(self.counts))
+        return '\n'.join(lines)
+
+# returns stats object for this thread (shared with nested calls, e.g. from subparsers), and whether this is the outermost call
+def _begin_stats(enabled):
+    stats = getattr(_profile_local, "current", None)
+    if stats is not None: return stats, False
+    if not (enabled or _profile_enabled): return None, False
+    stats = _profile_local.current = ParseStats()
+    return stats, True
+
+def _end_stats(stats, outer):
+    if not outer: return
+    stats.total = _clock()-stats._start
+    _profile_local.current = None
+    _profile_local.last = stats
+    if _profile_report: sys.stderr.write("magiconfig profile:\n"+repr(stats)+"\n")
+
+# get code object for config file, using hash-based pyc files in the cache directory
+# header follows PEP 552: magic number, flags (checked hash-based), source hash
+def _get_config_code(loader, module_id, path):
+    import importlib.util
+    if _bytecode_cache_dir is None or not hasattr(importlib.util, "source_hash"):
+        return loader.get_code(module_id)
+
+    import hashlib, marshal, struct
+    source = loader.get_data(path)
+    source_hash = importlib.util.source_hash(source)
+    # one entry per config file; stale entries are detected by the source hash
+    cache_name = "{}.{}.{}.pyc".format(
+        os.path.basename(path),
+        hashlib.sha1(path.encode("utf-8")).hexdigest()[:16],
+        sys.implementation.cache_tag,
+    )
+    cache_path = os.path.join(_bytecode_cache_dir, cache_name)
+    flags = struct.pack("<I", 0b11)
+    header = importlib.util.MAGIC_NUMBER + flags + source_hash
+
+    try:
+        with open(cache_path, 'rb') as infile:
+            data = infile.read()
+        if data[:16]==header:
+            return marshal.loads(data[16:])
+    # missing, unreadable, or corrupt cache file: recompile
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    code = loader.source_to_code(source, path)
+    # explicitly requested, so written even if sys.dont_write_bytecode is set
+    # write atomically, in case other processes read the same cache; read-only directory is not an error
+    tmp_path = _tmp_name(cache_path)
+    try:
+        if not os.path.isdir(_bytecode_cache_dir): os.makedirs(_bytecode_cache_dir)
+        with open(tmp_path, 'wb') as outfile:
+            outfile.write(header + marshal.dumps(code))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try: os.remove(tmp_path)
+        except OSError: pass
+    return code
+
+# names of modules imported by config files executed in this thread are recorded in _import_tracking.names, if set
+# _import_tracking.overrides: module name:module to use instead of sys.modules (or path of file to execute as a throwaway module when first imported)
+# (see ConfigWatcher; python 3 only)
+_import_tracking = _local()
+
+def _tracking_builtins(names, overrides):
+    import builtins
+    def tracking_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level==0:
+            names.append(name)
+            # (import of a submodule without fromlist returns the top-level package, so not overridden)
+            if name in overrides and (fromlist or '.' not in name):
+                module = overrides[name]
+                if isinstance(module, str): module = overrides[name] = _load_config_module(module)
+                return module
+        return builtins.__import__(name, globals, locals, fromlist, level)
+    return dict(vars(builtins), __import__=tracking_import)
+
+# execute config file in a throwaway module
+def _load_config_module(path):
+    import uuid
+    module_id = str(uuid.uuid4())
+    if _PY2:
+        module = imp.load_source(module_id, path)
+    else:
+        import importlib.machinery, importlib.util
+        # explicit loader: config files do not need a .py suffix
+        loader = importlib.machinery.SourceFileLoader(module_id, path)
+        spec = importlib.util.spec_from_file_location(module_id, path, loader=loader)
+        module = importlib.util.module_from_spec(spec)
+        # registered during execution for code that looks up its own module
+        sys.modules[module_id] = module
+        names = getattr(_import_tracking, "names", None)
+        if names is not None: module.__dict__["__builtins__"] = _tracking_builtins(names, _import_tracking.overrides)
+        try:
+            exec(_get_config_code(loader, module_id, path), module.__dict__)
+        except:
+            sys.modules.pop(module_id, None)
+            raise
+    if not _retain_config_modules:
+        sys.modules.pop(module_id, None)
+    return module
+
+# import config object from file, reusing a previous import if the file is unchanged
+# memo: optional dict of (path, obj):config to reuse imports without checking the file (e.g. within a batch)
+def _import_config(config_name, config_obj, memo=None):
+    path = os.path.abspath(config_name)
+    if memo is not None:
+        config = memo.get((path, config_obj), _missing)
+        if config is not _missing: return config
+    stat = os.stat(path)
+    key = (path, getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size, config_obj)
+    config = _config_cache.get(key, _missing)
+    if config is _missing:
+        if _is_snapshot(path):
+            config = _load_snapshot(path, config_obj)
+        else:
+            # import config as module
+            # (from configurati)
+            module = _load_config_module(path)
+            config = _rgetattr(module, config_obj)
+        _config_cache.put(key, config)
+    if memo is not None: memo[(path, config_obj)] = config
+    return config
+
+# binary snapshot of a parsed config (see ArgumentParser.write_snapshot())
+# format: magic, version, sha256 hash of parser schema, pickle of {"obj": obj, "values": dict of dotted dest:value}
+_snapshot_magic = b"MAGICFG\x00"
+_snapshot_version = 1
+_snapshot_header = ">8sH32s"
+
+# values are already converted if schema matches parser
+_ConfigSnapshot = collections.namedtuple("_ConfigSnapshot", ["schema", "values"])
+
+def _is_snapshot(path):
+    with open(path,'rb') as infile:
+        return infile.read(len(_snapshot_magic))==_snapshot_magic
+
+def _load_snapshot(path, config_obj):
+    import pickle, struct
+    header_size = struct.calcsize(_snapshot_header)
+    with open(path,'rb') as infile:
+        header = infile.read(header_size)
+        if len(header)<header_size:
+            raise MagiConfigError("Truncated config snapshot: {}".format(path))
+        magic, version, schema = struct.unpack(_snapshot_header, header)
+        if version!=_snapshot_version:
+            raise MagiConfigError("Unsupported config snapshot version {} in {}".format(version, path))
+        contents = pickle.load(infile)
+    if contents["obj"]!=config_obj:
+        raise MagiConfigError("Config snapshot {} contains {}, not {}".format(path, contents["obj"], config_obj))
+    return _ConfigSnapshot(schema, contents["values"])
+
+def _write_snapshot(path, schema, config_obj, values):
+    import pickle, struct
+    # written to a temporary file first, so an error does not leave a partial file
+    tmpname = _tmp_name(path)
+    try:
+        with open(tmpname,'wb') as outfile:
+            outfile.write(struct.pack(_snapshot_header, _snapshot_magic, _snapshot_version, schema))
+            pickle.dump({"obj": config_obj, "values": values}, outfile, pickle.HIGHEST_PROTOCOL)
+    except:
+        if os.path.exists(tmpname): os.remove(tmpname)
+        raise
+    _replace_file(tmpname, path)
+
+# handle values in sub-configs by restoring dots in keys
+def _flatten_vars(config, pre=""):
+    # already flat
+    if isinstance(config,FlatMagiConfig) and len(pre)==0: return config._flat_vars()
+    flat_vars = {}
+    for attr,val in _iteritems(vars(config)):
+        if isinstance(val,LazyMagiConfig): val = val.resolve()
+        if isinstance(val,MagiConfig):
+            flat_vars.update(_flatten_vars(val,pre+attr+"."))
+        else:
+            flat_vars[pre+attr] = val
+    return flat_vars
+
+# import config objects from several files concurrently (one thread per file), in the same order
+def _import_configs(config_names, config_obj, memo=None):
+    if len(config_names)==1: return [_import_config(config_names[0], config_obj, memo)]
+    configs = [None]*len(config_names)
+    errors = [None]*len(config_names)
+    def import_config(i):
+        try:
+            configs[i] = _import_config(config_names[i], config_obj, memo)
+        except Exception as e:
+            errors[i] = e
+    import threading
+    threads = [threading.Thread(target=import_config, args=(i,)) for i in range(len(config_names))]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    # report first error in order
+    for error in errors:
+        if error is not None: raise error
+    return configs
+
 class MagiConfig(argparse.Namespace):
-    def write(self, filename, config_obj, attr_imports=None, class_imports=None, attr_reprs=None, class_reprs=None, strict=False):
+    def write(self, filename, config_obj, attr_imports=None, class_imports=None, attr_reprs=None, class_reprs=None, strict=False, strict_workers=None, array_threshold=None):
         if len(config_obj)==0:
             raise MagiConfigError("config_obj must be specified")
 
@@ -59,46 +453,69 @@ class MagiConfig(argparse.Namespace):
         if attr_reprs is None: attr_reprs = {}
         if class_reprs is None: class_reprs = {}
 
-        # get lines to write
+        # first pass: collect imports
         default_imports = ["from magiconfig import MagiConfig"]
-        imports, lines = self._write(config_obj, attr_imports, class_imports, attr_reprs, class_reprs, strict)
+        imports = self._collect_imports(config_obj, attr_imports, class_imports, attr_reprs, class_reprs, array_threshold)
+        import_lines = default_imports+sorted(imports)
 
-        # write namespace into file
-        with open(filename,'w') as outfile:
-            outfile.write('\n'.join(default_imports+sorted(list(imports))+[""]+lines))
+        # strict="file": check the whole file once it is written; otherwise check each repr
+        checker = _ReprChecker(import_lines, strict_workers) if strict and strict!="file" else None
 
-    def _write(self, config_obj, attr_imports, class_imports, attr_reprs, class_reprs, strict):
+        # second pass: stream lines into file
+        try:
+            _write_file(filename, [(config_obj, self)], import_lines, attr_reprs, class_reprs, strict, checker, array_threshold)
+        finally:
+            if checker is not None: checker.close()
+
+    # collect import statements needed to write config (large arrays are loaded with load_array)
+    def _collect_imports(self, config_obj, attr_imports, class_imports, attr_reprs, class_reprs, array_threshold=None):
+        sidecars = _ArraySidecars("", array_threshold) if array_threshold is not None else None
         imports = set()
-        # create a magiconfig
-        lines = [config_obj+" = MagiConfig()"]
-        prepend = config_obj + "."
-        for attr,val in sorted(six.iteritems(vars(self))):
-            valclass = val.__class__
-            # recurse for nested configs
-            if valclass==self.__class__:
-                imports_tmp, lines_tmp = val._write(prepend+attr, attr_imports, class_imports, attr_reprs, class_reprs, strict)
-                imports.update(imports_tmp)
-                lines.extend(lines_tmp)
+        for prepend,attr,val in self._iter_write(config_obj):
+            if attr is None: continue
+            if sidecars is not None and sidecars.accepts(attr, val, attr_reprs, class_reprs):
+                imports.add("from magiconfig import load_array")
             else:
-                # precedence: attr-specific > class-specific > default
                 imports.update(self._get_imports(attr, val, attr_imports, class_imports))
-                repr_fn = attr_reprs.get(attr, class_reprs.get(valclass, repr))
-                repr_val = repr_fn(val)
-                # detect cases where repr() doesn't work as desired
-                if strict:
-                    try:
-                        repr_worked = eval(repr_val)
-                    # catch cases where eval(repr) completely fails
-                    except:
-                        repr_worked = False
-                    if not repr_worked or repr_worked!=val:
-                        error_lines = [
-                            "Inconsistency between original value and repr for {}:".format(prepend+attr),
-                            (val, repr_val)
-                        ]
-                        raise MagiConfigError('\n'.join(str(el) for el in error_lines))
-                lines.append(prepend+str(attr)+" = "+repr_val)
-        return imports, lines
+        return imports
+
+    # iterate over nested configs (attr=None) and values in the order they are written
+    # (iterative, so no recursion limit)
+    def _iter_write(self, config_obj):
+        yield config_obj, None, self
+        stack = [(config_obj+".", iter(sorted(_iteritems(vars(self)))))]
+        while stack:
+            prepend, items = stack[-1]
+            for attr,val in items:
+                if isinstance(val,LazyMagiConfig): val = val.resolve()
+                # descend into nested configs
+                if isinstance(val,MagiConfig):
+                    yield prepend+attr, None, val
+                    stack.append((prepend+attr+".", iter(sorted(_iteritems(vars(val))))))
+                    break
+                yield prepend, attr, val
+            else:
+                stack.pop()
+
+    # generate lines to write
+    def _write(self, config_obj, attr_reprs, class_reprs, checker=None, sidecars=None):
+        for prepend,attr,val in self._iter_write(config_obj):
+            # create a magiconfig
+            if attr is None:
+                yield prepend+" = MagiConfig()"
+                continue
+            # saved exactly, so not checked
+            if sidecars is not None and sidecars.accepts(attr, val, attr_reprs, class_reprs):
+                yield prepend+str(attr)+" = load_array("+repr(sidecars.save(prepend+attr, val))+", __file__)"
+                continue
+            valclass = val.__class__
+            # precedence: attr-specific > class-specific > default
+            repr_fn = attr_reprs.get(attr, class_reprs.get(valclass, repr))
+            repr_val = repr_fn(val)
+            # detect cases where repr() doesn't work as desired
+            if checker is not None:
+                checker.check(prepend+attr, val, repr_val)
+            yield prepend+str(attr)+" = "+repr_val
 
     # recursively check imports (avoiding infinite recursion in self-referential case)
     def _get_imports(self, attr, val, attr_imports, class_imports, checked=None):
@@ -106,19 +523,10 @@ class MagiConfig(argparse.Namespace):
         if checked is None: checked = set()
         imports = set()
 
-        def default_import(val):
-            valclass = val.__class__
-            if valclass.__module__=='__builtin__' or valclass.__module__=='builtins':
-                if valclass.__name__=='module':
-                    return "import {}".format(val.__name__)
-            else:
-                return "from {} import {}".format(valclass.__module__,valclass.__name__)
-            return None
-
         if id(val) not in checked:
             # precedence: attr-specific > class-specific > defaults
             attr_imports_actual = {} if attr is None else attr_imports
-            import_fn = attr_imports_actual.get(attr, class_imports.get(valclass, default_import))
+            import_fn = attr_imports_actual.get(attr, class_imports.get(valclass, _default_import))
             imports_to_add = import_fn(val)
             if imports_to_add is not None:
                 imports.add(imports_to_add)
@@ -126,17 +534,7 @@ class MagiConfig(argparse.Namespace):
             checked.add(id(val))
 
             # check collection entries
-            coll = None
-            if isinstance(val, Mapping):
-                coll = six.iteritems(val)
-            elif isinstance(val, Collection):
-                coll = val
-            elif isinstance(val, Container):
-                try:
-                    coll = vars(val)
-                except:
-                    # todo: solution for this case?
-                    pass
+            coll = _import_entries(val, class_imports)
             if coll is not None:
                 for subval in coll:
                     # will be applied to keys and values separately for dicts, i.e. attr-specific only use for MagiConfigs
@@ -144,25 +542,891 @@ class MagiConfig(argparse.Namespace):
 
         return imports
 
+    # get value of (non-dotted) attribute, or default if missing
+    # (unlike getattr(), does not return class members such as methods)
+    def _lookup(self, attr, default=None):
+        return self.__dict__.get(attr, default)
+
+    # get an immutable copy (see FrozenMagiConfig)
+    def freeze(self):
+        return FrozenMagiConfig(**vars(self))
+
     # to merge with another config
     def join(self, other_config, prefer_other=False):
-        for attr,val in six.iteritems(vars(other_config)):
+        for attr,val in _iteritems(vars(other_config)):
             if prefer_other or not hasattr(self,attr):
                 setattr(self,attr,val)
 
+    # to merge with another config recursively (iterative, so no recursion limit)
+    # policy: name of a policy in join_policies, or function(key, self_val, other_val) returning the value to keep
+    # returns list of conflicting keys (present in both configs with different values)
+    def deep_join(self, other_config, policy="self"):
+        if not callable(policy):
+            if policy not in join_policies: raise MagiConfigError("Unknown join policy: {}".format(policy))
+            policy = join_policies[policy]
+
+        # first pass: find values to assign, without modifying anything
+        assignments = []
+        conflicts = []
+        stack = [(self, other_config, "")]
+        while stack:
+            self_node, other_node, pre = stack.pop()
+            for attr,val in _iteritems(vars(other_node)):
+                if isinstance(val,LazyMagiConfig): val = val.resolve()
+                key = pre+attr
+                self_val = _lookup(self_node, attr, _missing) if self_node is not None else _missing
+                if isinstance(self_val,LazyMagiConfig): self_val = self_val.resolve()
+                if self_val is _missing:
+                    assignments.append((key, val))
+                elif isinstance(self_val,argparse.Namespace) and isinstance(val,argparse.Namespace):
+                    stack.append((self_val, val, key+"."))
+                elif not _values_equal(self_val, val):
+                    conflicts.append(key)
+                    # error policy: collect all conflicts before raising
+                    if policy is not _join_error:
+                        assignments.append((key, policy(key, self_val, val)))
+
+        if policy is _join_error and len(conflicts)>0:
+            raise MagiConfigError("Conflicting attributes in join: "+','.join(sorted(conflicts)))
+
+        # second pass: assign (nested configs from other_config are copied)
+        for key,val in assignments:
+            if isinstance(val,argparse.Namespace) and val is not _rgetattr(self,key,None):
+                val = _copy_config(val)
+            setattr(self,key,val)
+        return conflicts
+
     def __setattr__(self, attr, val):
         pre, _, post = attr.rpartition('.')
         if len(pre)>0:
             if not hasattr(self,pre):
-                object.__setattr__(self,pre,MagiConfig())
+                # recursive in case of multiple missing levels
+                setattr(self,pre,MagiConfig())
             object.__setattr__(_rgetattr(self,pre), post, val)
         else:
             object.__setattr__(self, post, val)
 
     def __getattr__(self, attr):
-        def _getattr(obj, attr):
-            return obj.__getattribute__(attr)
-        return functools.reduce(_getattr, [self] + attr.split('.'))
+        # only called if regular lookup fails, so a non-dotted attr does not exist
+        if '.' not in attr:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+        # getattr() also handles LazyMagiConfig
+        return functools.reduce(getattr, [self] + attr.split('.'))
+
+# placeholder for a config that is only built when it is needed:
+# when selected as (part of) the config object, when its attributes are accessed, or when its parent config is parsed or written
+# factory: function returning a MagiConfig, called with any additional args and kwargs
+class LazyMagiConfig(object):
+    def __init__(self, factory, *args, **kwargs):
+        self._factory = factory
+        self._args = args
+        self._kwargs = kwargs
+        self._config = None
+
+    def resolve(self):
+        if self._config is None:
+            self._config = self._factory(*self._args, **self._kwargs)
+        return self._config
+
+    # forward attribute access to the built config
+    def __getattr__(self, attr):
+        # internal members (e.g. during copy or unpickling)
+        if attr.startswith('_'):
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+        return getattr(self.resolve(), attr)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyMagiConfig): other = other.resolve()
+        return self.resolve()==other
+
+    def __ne__(self, other):
+        return not self==other
+
+    __hash__ = None
+
+# immutable, hashable MagiConfig (hashable if all values are hashable)
+# derived configs are created with with_(), which only copies the nested configs along the updated paths
+# and shares all other nested configs with the original
+class FrozenMagiConfig(MagiConfig):
+    __slots__ = ("_hash",)
+
+    def __init__(self, **kwargs):
+        for attr,val in _iteritems(kwargs):
+            if '.' in attr:
+                raise MagiConfigError("FrozenMagiConfig attribute names cannot contain dots: {}".format(attr))
+            object.__setattr__(self, attr, _freeze(val))
+
+    def __setattr__(self, attr, val):
+        raise MagiConfigError("cannot set attribute {} of FrozenMagiConfig".format(attr))
+
+    def __delattr__(self, attr):
+        raise MagiConfigError("cannot delete attribute {} of FrozenMagiConfig".format(attr))
+
+    def __hash__(self):
+        try:
+            return object.__getattribute__(self, "_hash")
+        except AttributeError:
+            result = hash(frozenset(_iteritems(vars(self))))
+            object.__setattr__(self, "_hash", result)
+            return result
+
+    def __reduce__(self):
+        return (_frozen_magiconfig_from_vars, (dict(vars(self)),))
+
+    # returns a new config with updated values; the original is unchanged
+    # updates: dict that may include dotted names; kwargs: non-dotted names
+    def with_(self, updates=None, **kwargs):
+        if updates is None: updates = {}
+        new_vars = dict(vars(self))
+        nested = {}
+        for attr,val in list(_iteritems(updates))+list(_iteritems(kwargs)):
+            pre, _, post = attr.partition('.')
+            if len(post)>0:
+                nested.setdefault(pre, {})[post] = val
+            else:
+                new_vars[pre] = _freeze(val)
+        # copy along the path of each nested update
+        for pre,nested_updates in _iteritems(nested):
+            child = new_vars.get(pre, None)
+            if child is None: child = FrozenMagiConfig()
+            elif not isinstance(child, FrozenMagiConfig):
+                raise AttributeError("'{}' object has no attribute '{}'".format(child.__class__.__name__, next(iter(nested_updates)).split('.')[0]))
+            new_vars[pre] = child.with_(nested_updates)
+        return _frozen_magiconfig_from_vars(new_vars)
+
+    def freeze(self):
+        return self
+
+    # get a mutable copy (leaf values are shared)
+    def thaw(self):
+        config = MagiConfig()
+        for attr,val in _iteritems(vars(self)):
+            object.__setattr__(config, attr, val.thaw() if isinstance(val, FrozenMagiConfig) else val)
+        return config
+
+def _freeze(val):
+    if isinstance(val, MagiConfig): return val.freeze()
+    return val
+
+# no checks or conversions: values must already be frozen
+def _frozen_magiconfig_from_vars(frozen_vars):
+    config = FrozenMagiConfig()
+    for attr,val in _iteritems(frozen_vars):
+        object.__setattr__(config, attr, val)
+    return config
+
+# ordered dict for child names (insertion order matches vars() of nested MagiConfig objects)
+_odict = dict if sys.version_info>=(3,7) else collections.OrderedDict
+
+# MagiConfig that stores all leaves in a single dict keyed by full dotted path
+# nested configs are views that share the same storage, so dotted reads and writes are dict lookups
+# an index of prefix:child names allows enumerating subtrees
+class FlatMagiConfig(MagiConfig):
+    def __init__(self, **kwargs):
+        object.__setattr__(self, "_leaves", {})
+        object.__setattr__(self, "_index", {"": _odict()})
+        object.__setattr__(self, "_lazy", set())
+        object.__setattr__(self, "_prefix", "")
+        MagiConfig.__init__(self, **kwargs)
+
+    # nested config sharing the storage of its root
+    def _view(self, path):
+        view = object.__new__(self.__class__)
+        for member in ["_leaves", "_index", "_lazy"]:
+            object.__setattr__(view, member, object.__getattribute__(self, member))
+        object.__setattr__(view, "_prefix", path)
+        return view
+
+    def _path(self, attr):
+        return self._prefix+"."+attr if len(self._prefix)>0 else attr
+
+    # make sure that path is listed in its parent (and all ancestors exist)
+    def _link(self, path):
+        parent, _, name = path.rpartition('.')
+        children = self._index.get(parent, None)
+        if children is None:
+            if parent in self._leaves:
+                leaf = self._leaves[parent]
+                raise AttributeError("'{}' object has no attribute '{}'".format(leaf.__class__.__name__, name))
+            self._link(parent)
+            children = self._index[parent] = _odict()
+        children[name] = None
+
+    def _remove(self, path):
+        if path in self._leaves:
+            del self._leaves[path]
+            self._lazy.discard(path)
+        elif path in self._index:
+            for child in list(self._index[path]):
+                self._remove(path+"."+child)
+            del self._index[path]
+        else:
+            return False
+        parent, _, name = path.rpartition('.')
+        self._index[parent].pop(name, None)
+        return True
+
+    def _set(self, path, val):
+        # contents of nested configs are collected before removing the old value,
+        # since val may be a view of this storage (e.g. c.sub = c.sub)
+        items = list(self._walk(path, val))
+        self._remove(path)
+        for subpath,subval in items:
+            self._link(subpath)
+            if subval is _missing:
+                self._index[subpath] = _odict()
+            else:
+                self._leaves[subpath] = subval
+                if isinstance(subval, LazyMagiConfig): self._lazy.add(subpath)
+
+    # (path, value) for val and its contents, with value = _missing for nested configs
+    def _walk(self, path, val):
+        if isinstance(val, MagiConfig):
+            yield path, _missing
+            for attr,subval in list(_iteritems(vars(val))):
+                for item in self._walk(path+"."+attr, subval):
+                    yield item
+        else:
+            yield path, val
+
+    def _get(self, path):
+        if path in self._leaves: return self._leaves[path]
+        elif path in self._index: return self._view(path)
+        else: raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, path))
+
+    def __setattr__(self, attr, val):
+        self._set(self._path(attr), val)
+
+    def __getattr__(self, attr):
+        # storage not initialized yet (e.g. during copy)
+        try:
+            object.__getattribute__(self, "_leaves")
+        except AttributeError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+        return self._get(self._path(attr))
+
+    def __delattr__(self, attr):
+        if not self._remove(self._path(attr)):
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+
+    # preserve vars() semantics: nested configs appear as (view) objects
+    @property
+    def __dict__(self):
+        children = self._index.get(self._prefix, {})
+        return _odict((name, self._get(self._path(name))) for name in children)
+
+    # dict of dotted path:value for leaves in this (sub)config
+    # for the root (without lazy configs), this is the storage itself, which must not be modified
+    def _flat_vars(self):
+        if len(self._prefix)==0:
+            flat_vars = self._leaves
+        else:
+            flat_vars = {}
+            pre = self._prefix+"."
+            stack = [self._prefix]
+            while stack:
+                path = stack.pop()
+                for name in self._index[path]:
+                    subpath = path+"."+name
+                    if subpath in self._leaves: flat_vars[subpath[len(pre):]] = self._leaves[subpath]
+                    else: stack.append(subpath)
+        # expand any lazy configs
+        if len(self._lazy)>0:
+            expanded = {}
+            for attr,val in _iteritems(flat_vars):
+                if isinstance(val, LazyMagiConfig):
+                    expanded.update(_flat_magiconfig_from_vars({attr: val.resolve()})._flat_vars())
+                else:
+                    expanded[attr] = val
+            flat_vars = expanded
+        return flat_vars
+
+    def _lookup(self, attr, default=None):
+        try:
+            return self._get(self._path(attr))
+        except AttributeError:
+            return default
+
+    # pickle/copy as a new root containing this (sub)config
+    def __reduce__(self):
+        return (_flat_magiconfig_from_vars, (self._flat_vars(),))
+
+def _flat_magiconfig_from_vars(flat_vars):
+    config = FlatMagiConfig()
+    for attr,val in _iteritems(flat_vars):
+        config._set(attr, val)
+    return config
+
+# view that resolves attributes through an ordered stack of configs (first layer has the highest priority), without copying
+# nested configs present in multiple layers are also resolved as layered views
+# writes and deletions only affect the first layer (as in collections.ChainMap)
+class LayeredMagiConfig(MagiConfig):
+    def __init__(self, *layers):
+        if len(layers)==0: layers = (MagiConfig(),)
+        object.__setattr__(self, "_layers", list(layers))
+        # target for writes: first layer of the root view, and path of this view within it
+        object.__setattr__(self, "_root", layers[0])
+        object.__setattr__(self, "_prefix", "")
+
+    def _view(self, layers, attr):
+        view = object.__new__(self.__class__)
+        object.__setattr__(view, "_layers", layers)
+        object.__setattr__(view, "_root", self._root)
+        object.__setattr__(view, "_prefix", self._prefix+"."+attr if len(self._prefix)>0 else attr)
+        return view
+
+    def _lookup(self, attr, default=None):
+        configs = []
+        for layer in self._layers:
+            val = _lookup(layer, attr, _missing)
+            if val is _missing: continue
+            if isinstance(val, LazyMagiConfig): val = val.resolve()
+            if isinstance(val, argparse.Namespace):
+                configs.append(val)
+            # non-config value shadows configs in lower layers
+            elif len(configs)>0:
+                break
+            else:
+                return val
+        if len(configs)==0: return default
+        return self._view(configs, attr)
+
+    def __getattr__(self, attr):
+        # layers not initialized yet (e.g. during copy)
+        try:
+            object.__getattribute__(self, "_layers")
+        except AttributeError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+        if '.' in attr:
+            return functools.reduce(getattr, [self] + attr.split('.'))
+        val = self._lookup(attr, _missing)
+        if val is _missing:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, attr))
+        return val
+
+    def __setattr__(self, attr, val):
+        setattr(self._root, self._prefix+"."+attr if len(self._prefix)>0 else attr, val)
+
+    def __delattr__(self, attr):
+        pre, _, post = (self._prefix+"."+attr if len(self._prefix)>0 else attr).rpartition('.')
+        delattr(_rgetattr(self._root, pre) if len(pre)>0 else self._root, post)
+
+    # preserve vars() semantics: merged attributes from all layers, nested configs appear as (view) objects
+    @property
+    def __dict__(self):
+        attrs = _odict()
+        for layer in self._layers:
+            for attr in vars(layer):
+                attrs[attr] = None
+        merged = _odict()
+        for attr in attrs:
+            merged[attr] = self._lookup(attr)
+        return merged
+
+    # get a concrete MagiConfig with the merged contents (values are not copied)
+    def flatten(self):
+        config = MagiConfig()
+        for attr,val in _iteritems(vars(self)):
+            object.__setattr__(config, attr, val.flatten() if isinstance(val, LayeredMagiConfig) else val)
+        return config
+
+    def __reduce__(self):
+        if len(self._prefix)==0: return (self.__class__, tuple(self._layers))
+        # nested view: becomes a new root
+        else: return (self.__class__, (self.flatten(),))
+
+# one or more dests (zipped) that take values together
+class _SweepAxis(object):
+    def __init__(self, dests, values):
+        self.dests = dests
+        self.values = values
+
+    def __len__(self):
+        return len(self.values[0])
+
+    def select(self, index, overrides, bases):
+        for dest,values in zip(self.dests,self.values):
+            setattr(overrides, dest, values[index])
+
+# dest whose value selects a sub-sweep: positions are the points of each sub-sweep in order
+class _ConditionalSweepAxis(object):
+    def __init__(self, dest, branches):
+        self.dest = dest
+        self.branches = branches
+        # starting position of each branch (sizes computed once)
+        self.offsets = []
+        size = 0
+        for value,sweep in branches:
+            self.offsets.append(size)
+            size += len(sweep)
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def select(self, index, overrides, bases):
+        # (last branch starting at or before index, so empty branches are skipped)
+        import bisect
+        branch = bisect.bisect_right(self.offsets, index)-1
+        value, sweep = self.branches[branch]
+        setattr(overrides, self.dest, value)
+        sweep._select(index-self.offsets[branch], overrides, bases)
+        bases.append(sweep.base)
+
+# Cartesian product of parameter values applied to a base config
+# derived configs are only created when requested (by index or iteration)
+class MagiConfigSweep(object):
+    def __init__(self, base=None):
+        self.base = base if base is not None else MagiConfig()
+        self._axes = []
+
+    # values: sequence of values for dest
+    def add_axis(self, dest, values):
+        return self.add_zip([(dest, values)])
+
+    # axes: dict (or list of pairs) of dest:values, with values for all dests of the same length
+    def add_zip(self, axes):
+        if isinstance(axes, Mapping): axes = list(_iteritems(axes))
+        dests = [dest for dest,values in axes]
+        values = [values if isinstance(values, (list, tuple, _range)) else tuple(values) for dest,values in axes]
+        if len(dests)==0:
+            raise MagiConfigError("No axes provided")
+        if len(set(len(vals) for vals in values))>1:
+            raise MagiConfigError("Zipped axes have different lengths: "+','.join(dests))
+        self._axes.append(_SweepAxis(dests, values))
+        return self
+
+    # branches: dict (or list of pairs) of value:MagiConfigSweep, for the sub-sweep that applies when dest has that value
+    # (the sizes of the sub-sweeps are fixed at this point)
+    def add_conditional(self, dest, branches):
+        if isinstance(branches, Mapping): branches = list(_iteritems(branches))
+        self._axes.append(_ConditionalSweepAxis(dest, list(branches)))
+        return self
+
+    def __len__(self):
+        size = 1
+        for axis in self._axes:
+            size *= len(axis)
+        return size
+
+    # set values for point index (mixed radix: the last axis varies fastest)
+    def _select(self, index, overrides, bases):
+        indices = []
+        for axis in reversed(self._axes):
+            index, axis_index = divmod(index, len(axis))
+            indices.append(axis_index)
+        for axis,axis_index in zip(self._axes, reversed(indices)):
+            axis.select(axis_index, overrides, bases)
+
+    # get config for point index, as a LayeredMagiConfig (changes only affect the point's own layer)
+    def __getitem__(self, index):
+        size = len(self)
+        if index<0: index += size
+        if index<0 or index>=size:
+            raise IndexError("sweep index out of range")
+        overrides = MagiConfig()
+        bases = []
+        self._select(index, overrides, bases)
+        return LayeredMagiConfig(*([overrides]+bases+[self.base]))
+
+    def __iter__(self):
+        for index in _range(len(self)):
+            yield self[index]
+
+# get value of (non-dotted) attribute from any namespace, or default if missing
+def _lookup(config, attr, default=None):
+    if isinstance(config, MagiConfig): return config._lookup(attr, default)
+    return vars(config).get(attr, default)
+
+# equality that does not fail for values (e.g. arrays) whose comparison does not return a bool
+def _values_equal(val1, val2):
+    try:
+        result = val1==val2
+        try:
+            return bool(result)
+        # elementwise comparison
+        except ValueError:
+            return getattr(val1, "shape", None)==getattr(val2, "shape", None) and bool(result.all())
+    except Exception:
+        return val1 is val2
+
+# copy nested configs into new MagiConfig objects (values are not copied); iterative
+def _copy_config(config):
+    result = MagiConfig()
+    stack = [(result, config)]
+    while stack:
+        dest, src = stack.pop()
+        for attr,val in _iteritems(vars(src)):
+            if isinstance(val,LazyMagiConfig): val = val.resolve()
+            if isinstance(val,argparse.Namespace):
+                subdest = MagiConfig()
+                object.__setattr__(dest, attr, subdest)
+                stack.append((subdest, val))
+            else:
+                object.__setattr__(dest, attr, val)
+    return result
+
+def _join_self(key, self_val, other_val):
+    return self_val
+
+def _join_other(key, self_val, other_val):
+    return other_val
+
+def _join_error(key, self_val, other_val):
+    raise MagiConfigError("Conflicting attribute in join: "+key)
+
+# concatenate lists or tuples; otherwise, prefer self
+def _join_concat(key, self_val, other_val):
+    if isinstance(self_val, (list, tuple)) and isinstance(other_val, (list, tuple)):
+        return self_val + type(self_val)(other_val)
+    return self_val
+
+# policies for MagiConfig.deep_join()
+join_policies = {
+    "self": _join_self,
+    "other": _join_other,
+    "error": _join_error,
+    "concat": _join_concat,
+}
+
+# import discovery for MagiConfig.write()
+# (memoized per class, except for modules; weak keys, so classes from discarded config modules are not kept alive)
+_default_imports = weakref.WeakKeyDictionary()
+
+def _default_import(val):
+    valclass = val.__class__
+    try:
+        return _default_imports[valclass]
+    except KeyError:
+        pass
+    result = None
+    if valclass.__module__=='__builtin__' or valclass.__module__=='builtins':
+        if valclass.__name__=='module':
+            return "import {}".format(val.__name__)
+    else:
+        result = "from {} import {}".format(valclass.__module__,valclass.__name__)
+    _default_imports[valclass] = result
+    return result
+
+# builtin types that never need imports and do not contain other types
+_atomic_types = frozenset(_integer_types + _string_types + (float, complex, bool, type(None), _text_type, _binary_type))
+_builtin_collections = frozenset([list, tuple, set, frozenset])
+# numpy dtype kinds whose entries are all of the same (non-object) scalar type
+_numpy_scalar_kinds = frozenset("biufcmMUS")
+
+# how to find entries of a class (memoized, with weak keys as above)
+_collection_kinds = weakref.WeakKeyDictionary()
+
+def _collection_kind(valclass):
+    kind = _collection_kinds.get(valclass)
+    if kind is None:
+        if valclass in _atomic_types: kind = "atomic"
+        elif any(c.__module__=="numpy" and c.__name__=="ndarray" for c in getattr(valclass, "__mro__", ())): kind = "ndarray"
+        elif issubclass(valclass, Mapping): kind = "mapping"
+        elif issubclass(valclass, Collection): kind = "collection"
+        elif issubclass(valclass, Container): kind = "container"
+        else: kind = "other"
+        _collection_kinds[valclass] = kind
+    return kind
+
+# entries of val to check for imports, or None
+# homogeneous containers of atomic builtin types and numeric numpy arrays are handled without visiting every entry
+# (unless class_imports has entries for the types involved)
+def _import_entries(val, class_imports):
+    valclass = val.__class__
+    kind = _collection_kind(valclass)
+    if kind=="atomic":
+        # entries of strings are strings
+        return val if valclass in class_imports and isinstance(val, Collection) else None
+    elif kind=="ndarray":
+        if not val.dtype.hasobject and val.dtype.kind in _numpy_scalar_kinds:
+            # all entries have the same type: check one (one level at a time for multidimensional arrays)
+            return [val[0]] if val.ndim>0 and val.size>0 else None
+        return val
+    elif kind=="mapping":
+        # entries are (key, value) tuples
+        if isinstance(val, dict) and tuple not in class_imports:
+            entry_types = set(map(type, val))
+            entry_types.update(map(type, _itervalues(val)))
+            if entry_types <= _atomic_types and entry_types.isdisjoint(class_imports): return None
+        return _iteritems(val)
+    elif kind=="collection":
+        if valclass in _builtin_collections:
+            entry_types = set(map(type, val))
+            if entry_types <= _atomic_types and entry_types.isdisjoint(class_imports): return None
+        return val
+    elif kind=="container":
+        try:
+            return vars(val)
+        except:
+            # todo: solution for this case?
+            pass
+    return None
+
+# load array saved by MagiConfig.write(..., array_threshold) (memory-mapped, read-only)
+# filename: relative to directory of config_file, if provided
+def load_array(filename, config_file=None):
+    import numpy
+    if config_file is not None:
+        filename = os.path.join(os.path.dirname(os.path.abspath(config_file)), filename)
+    # while a written file is checked, its arrays are loaded from the temporary files (see _check_file())
+    redirect = getattr(_sidecar_redirect, "paths", None)
+    if redirect is not None: filename = redirect.get(os.path.abspath(filename), filename)
+    return numpy.load(filename, mmap_mode='r')
+
+# path:temporary path for load_array() in this thread, if set
+_sidecar_redirect = _local()
+
+# numpy arrays with at least threshold entries, saved next to the config file as name.obj.attr.npy
+# (unless attr_reprs or class_reprs has a custom repr for the entry)
+class _ArraySidecars(object):
+    def __init__(self, filename, threshold):
+        self.dir, base = os.path.split(os.path.abspath(filename))
+        self.base = os.path.splitext(base)[0]
+        self.threshold = threshold
+        # (path, temporary path) for each array
+        self.written = []
+
+    def accepts(self, attr, val, attr_reprs=None, class_reprs=None):
+        if attr_reprs is not None and attr in attr_reprs: return False
+        if class_reprs is not None and val.__class__ in class_reprs: return False
+        return _collection_kind(val.__class__)=="ndarray" and not val.dtype.hasobject and val.size>=self.threshold
+
+    # written to temporary file until commit()
+    def save(self, name, val):
+        import numpy
+        sidecar = "{}.{}.npy".format(self.base, name)
+        path = os.path.join(self.dir, sidecar)
+        tmpname = _tmp_name(path)
+        self.written.append((path, tmpname))
+        with open(tmpname,'wb') as outfile:
+            numpy.save(outfile, val)
+        return sidecar
+
+    def commit(self):
+        for path,tmpname in self.written:
+            _replace_file(tmpname, path)
+        self.written = []
+
+    def discard(self):
+        for path,tmpname in self.written:
+            if os.path.exists(tmpname): os.remove(tmpname)
+        self.written = []
+
+# write named configs into one file, with the provided import statements
+# (written to a temporary file first, so an error from strict mode does not leave a partial file)
+def _write_file(filename, named_configs, import_lines, attr_reprs, class_reprs, strict, checker, array_threshold):
+    tmpname = _tmp_name(filename)
+    sidecars = _ArraySidecars(filename, array_threshold) if array_threshold is not None else None
+    try:
+        with open(tmpname,'w') as outfile:
+            outfile.write('\n'.join(import_lines+[""]))
+            parents = set()
+            for config_obj,config in named_configs:
+                # create parents for dotted names
+                parts = config_obj.split('.')
+                for i in range(1,len(parts)):
+                    parent = '.'.join(parts[:i])
+                    if parent not in parents:
+                        parents.add(parent)
+                        outfile.write('\n'+parent+" = MagiConfig()")
+                parents.add(config_obj)
+                for line in config._write(config_obj, attr_reprs, class_reprs, checker, sidecars):
+                    outfile.write('\n')
+                    outfile.write(line)
+        if checker is not None: checker.finish()
+        if strict=="file": _check_file(tmpname, filename, named_configs, sidecars)
+        # existing arrays are only replaced once the file is complete (and checked)
+        if sidecars is not None: sidecars.commit()
+    except:
+        if os.path.exists(tmpname): os.remove(tmpname)
+        if sidecars is not None: sidecars.discard()
+        raise
+    _replace_file(tmpname, filename)
+
+# execute written file once and compare with original values
+def _check_file(tmpname, filename, named_configs, sidecars=None):
+    with open(tmpname,'r') as infile:
+        code = compile(infile.read(), filename, 'exec')
+    file_globals = {"__name__": "__magiconfig_check__", "__file__": os.path.abspath(filename)}
+    # arrays are loaded from the new (temporary) files, which are compared along with the other values
+    if sidecars is not None: _sidecar_redirect.paths = dict(sidecars.written)
+    try:
+        exec(code, file_globals)
+    except Exception as e:
+        raise MagiConfigError("Could not execute written config file {}: {}".format(filename, e))
+    finally:
+        _sidecar_redirect.paths = None
+    for config_obj,config in named_configs:
+        first, _, rest = config_obj.partition('.')
+        loaded = file_globals.get(first, _missing)
+        if loaded is not _missing and len(rest)>0: loaded = _rgetattr(loaded, rest, _missing)
+        for prepend,attr,val in config._iter_write(config_obj):
+            if attr is None: continue
+            name = prepend+attr
+            loaded_val = _missing if loaded is _missing else _rgetattr(loaded, name[len(config_obj)+1:], _missing)
+            if loaded_val is _missing or not _values_equal(loaded_val, val):
+                error_lines = [
+                    "Inconsistency between original value and written file for {}:".format(name),
+                    (val, None if loaded_val is _missing else loaded_val)
+                ]
+                raise MagiConfigError('\n'.join(str(el) for el in error_lines))
+
+# write many configs into shard files with shard_size configs each, named path_0, path_1, etc. (before the extension)
+# configs: dict of name:config, or sequence of configs (named obj_0, obj_1, etc.)
+# also writes index (json) of name:shard file, named path_index.json
+def write_many(configs, path, shard_size=1000, obj="config", attr_imports=None, class_imports=None, attr_reprs=None, class_reprs=None, strict=False, strict_workers=None, array_threshold=None):
+    if shard_size<1:
+        raise MagiConfigError("shard_size must be at least 1")
+
+    # defaults
+    if attr_imports is None: attr_imports = {}
+    if class_imports is None: class_imports = {}
+    if attr_reprs is None: attr_reprs = {}
+    if class_reprs is None: class_reprs = {}
+
+    # configs are traversed twice
+    if not isinstance(configs, Mapping) and iter(configs) is configs: configs = list(configs)
+    def named_configs():
+        if isinstance(configs, Mapping): return _iteritems(configs)
+        return (("{}_{}".format(obj, i), config) for i,config in enumerate(configs))
+
+    # first pass: collect imports for all configs
+    default_imports = ["from magiconfig import MagiConfig"]
+    imports = set()
+    for config_obj,config in named_configs():
+        imports.update(config._collect_imports(config_obj, attr_imports, class_imports, attr_reprs, class_reprs, array_threshold))
+    import_lines = default_imports+sorted(imports)
+
+    # strict="file": check each shard once it is written; otherwise check each repr
+    # (results are reused for all shards)
+    checker = _ReprChecker(import_lines, strict_workers) if strict and strict!="file" else None
+
+    # second pass: write shards
+    root, ext = os.path.splitext(path)
+    index = _odict()
+    def write_shard(shard):
+        filename = "{}_{}{}".format(root, len(shards), ext)
+        _write_file(filename, shard, import_lines, attr_reprs, class_reprs, strict, checker, array_threshold)
+        shards.append(filename)
+        for config_obj,config in shard:
+            index[config_obj] = os.path.basename(filename)
+    shards = []
+    try:
+        shard = []
+        for config_obj,config in named_configs():
+            shard.append((config_obj, config))
+            if len(shard)==shard_size:
+                write_shard(shard)
+                shard = []
+        if len(shard)>0: write_shard(shard)
+    finally:
+        if checker is not None: checker.close()
+
+    # index is written last, so it is only present if all shards were written
+    import json
+    index_name = root+"_index.json"
+    tmpname = _tmp_name(index_name)
+    try:
+        with open(tmpname,'w') as outfile:
+            json.dump(index, outfile, indent=0)
+    except:
+        if os.path.exists(tmpname): os.remove(tmpname)
+        raise
+    _replace_file(tmpname, index_name)
+    return index_name
+
+# strict checking of repr-style strings written by MagiConfig.write()
+def _repr_error(name, val, repr_val):
+    error_lines = [
+        "Inconsistency between original value and repr for {}:".format(name),
+        (val, repr_val)
+    ]
+    return MagiConfigError('\n'.join(str(el) for el in error_lines))
+
+# reprs are evaluated with the imports that are written into the file
+def _repr_globals(imports):
+    result = dict(globals())
+    for line in imports:
+        try:
+            exec(line, result)
+        except Exception:
+            pass
+    return result
+
+def _repr_matches(repr_val, val, repr_globals):
+    try:
+        return _values_equal(eval(repr_val, repr_globals), val)
+    # catch cases where eval(repr) completely fails
+    except Exception:
+        return False
+
+_repr_worker_globals = None
+
+def _init_repr_worker(imports):
+    global _repr_worker_globals
+    _repr_worker_globals = _repr_globals(imports)
+
+# returns indices of failed checks
+def _check_repr_batch(batch):
+    return [i for i,(repr_val,val) in enumerate(batch) if not _repr_matches(repr_val, val, _repr_worker_globals)]
+
+# results are memoized by (class, repr); checks can be distributed to a pool of worker processes
+class _ReprChecker(object):
+    batch_size = 256
+
+    def __init__(self, imports, workers=None):
+        self._globals = _repr_globals(imports)
+        self._memo = {}
+        self._pool = None
+        self._batch = []
+        self._pending = []
+        if workers is not None and workers>0:
+            import multiprocessing
+            self._pool = multiprocessing.Pool(workers, _init_repr_worker, (imports,))
+
+    def check(self, name, val, repr_val):
+        key = (val.__class__, repr_val)
+        # identical checks that are still pending in the pool are not repeated
+        if key in self._memo:
+            if self._memo[key] is False: raise _repr_error(name, val, repr_val)
+            return
+        if self._pool is None:
+            self._memo[key] = _repr_matches(repr_val, val, self._globals)
+            if not self._memo[key]: raise _repr_error(name, val, repr_val)
+        else:
+            self._memo[key] = None
+            self._batch.append((name, val, repr_val, key))
+            if len(self._batch)>=self.batch_size: self._submit()
+
+    def _submit(self):
+        batch = self._batch
+        self._batch = []
+        self._pending.append((batch, self._pool.apply_async(_check_repr_batch, ([(repr_val,val) for name,val,repr_val,key in batch],))))
+
+    # wait for pending checks, reporting the first failure in write order
+    def finish(self):
+        if self._pool is None: return
+        if len(self._batch)>0: self._submit()
+        for batch,result in self._pending:
+            try:
+                failed = result.get()
+            # values that cannot be sent to worker processes are checked locally
+            except Exception:
+                failed = [i for i,(name,val,repr_val,key) in enumerate(batch) if not _repr_matches(repr_val, val, self._globals)]
+            for i,(name,val,repr_val,key) in enumerate(batch):
+                self._memo[key] = i not in failed
+            if len(failed)>0:
+                self._pending = []
+                name, val, repr_val, key = batch[failed[0]]
+                raise _repr_error(name, val, repr_val)
+        self._pending = []
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
 
 class MagiConfigOptions(object):
     # arguments:
@@ -179,11 +1443,13 @@ class MagiConfigOptions(object):
     # strict_args = optional argument to specify strictness on command line
     # strict_help = custom help message for strict arg
     # strict_dest = destination for strict arg
+    # append = accept multiple config files (merged in order)
     def __init__(
         self,
         args=["-C","--config"], help=None, required=False, default="", dest="config",
         obj="config", obj_args=None, obj_help=None, obj_dest="obj",
         strict=False, strict_args=None, strict_help=None, strict_dest="strict",
+        append=False,
     ):
         if (obj is None or len(obj)==0) and obj_args is None:
             raise MagiConfigError("obj or obj_args must be specified")
@@ -201,6 +1467,7 @@ class MagiConfigOptions(object):
         self.strict_args = strict_args
         self.strict_help = strict_help
         self.strict_dest = strict_dest
+        self.append = append
 
 # patch base class to remove recursively through all groups (defined as standalone to be used on other objects)
 # this is needed to get correct help messages if set_config_options is called to make changes after initialization
@@ -213,6 +1480,7 @@ def _remove_action_all(self, action, throw=True):
             self._dests_actions[action.dest].remove(action)
             if len(self._dests_actions[action.dest])==0:
                 self._dests_actions.pop(action.dest)
+            self._conversion_plan.clear()
     except:
         if throw: raise
         else: pass
@@ -227,6 +1495,7 @@ class _ArgumentGroup(argparse._ArgumentGroup):
         argparse._ArgumentGroup.__init__(self, container, *args, **kwargs)
         self._dests_actions = container._dests_actions
         self._config_only = container._config_only
+        self._conversion_plan = container._conversion_plan
 
     # keep map of dest:action(s)
     _add_action_orig = argparse._ArgumentGroup._add_action
@@ -237,6 +1506,7 @@ class _ArgumentGroup(argparse._ArgumentGroup):
 
         action = self._add_action_orig(action)
         self._dests_actions[action.dest].append(action)
+        self._conversion_plan.clear()
         return action
 
 class _MutuallyExclusiveGroup(argparse._MutuallyExclusiveGroup):
@@ -244,6 +1514,7 @@ class _MutuallyExclusiveGroup(argparse._MutuallyExclusiveGroup):
         argparse._MutuallyExclusiveGroup.__init__(self, container, **kwargs)
         self._dests_actions = container._dests_actions
         self._config_only = container._config_only
+        self._conversion_plan = container._conversion_plan
 
     # keep map of dest:action(s)
     _add_action_orig = argparse._MutuallyExclusiveGroup._add_action
@@ -254,6 +1525,7 @@ class _MutuallyExclusiveGroup(argparse._MutuallyExclusiveGroup):
 
         action = self._add_action_orig(action)
         self._dests_actions[action.dest].append(action)
+        self._conversion_plan.clear()
         return action
 
 class ArgumentParser(argparse.ArgumentParser):
@@ -262,15 +1534,22 @@ class ArgumentParser(argparse.ArgumentParser):
     def __init__(self, *args, **kwargs):
         self.config_options = kwargs.pop("config_options", None)
         self._config_only_help = kwargs.pop("config_only_help", True)
+        # collect ParseStats for each parse (see get_parse_stats())
+        self._profile = kwargs.pop("profile", False)
         # must be defined before base class constructor is called
         self._dests_actions = collections.defaultdict(list)
         self._config_only = collections.OrderedDict()
+        # compiled per-dest conversions for parse_config(), cleared whenever dests change
+        self._conversion_plan = {}
         argparse.ArgumentParser.__init__(self, *args, **kwargs)
         self._config_actions = None
 
         # to toggle legacy behavior
         self._ignore_conflict_config_only = False
 
+        # imported configs shared between calls in parse_many()
+        self._config_memo = None
+
         # initialize config args from options
         self._init_config()
 
@@ -283,6 +1562,8 @@ class ArgumentParser(argparse.ArgumentParser):
         self._obj_dest = ""
         self._strict_dest = ""
         self._config_actions = None
+        self._config_scanner = None
+        self._config_only_parser = None
 
         # get dest w/ check for positionals
         # based on argparse.add_argument() condition
@@ -305,12 +1586,18 @@ class ArgumentParser(argparse.ArgumentParser):
             # exclude dest kwarg for positional
             _config_kwargs = dict(
                 type=str,
-                help=self.config_options.help if self.config_options.help is not None else "name of config file to import (w/ object"+(": "+self.config_options.obj if self.config_options.obj_args is None else " from "+",".join(self.config_options.obj_args))+")",
+                help=self.config_options.help if self.config_options.help is not None else ("names of config files to import, later files override earlier files" if self.config_options.append else "name of config file to import")+" (w/ object"+(": "+self.config_options.obj if self.config_options.obj_args is None else " from "+",".join(self.config_options.obj_args))+")",
             )
             if self.config_options.default is not None and len(self.config_options.default)>0:
                 _config_kwargs.update(
                     default=self.config_options.default,
                 )
+            # multiple config files (command-line files are added after default files)
+            if self.config_options.append:
+                if "default" in _config_kwargs and not isinstance(_config_kwargs["default"],list):
+                    _config_kwargs["default"] = list(_config_kwargs["default"]) if isinstance(_config_kwargs["default"],tuple) else [_config_kwargs["default"]]
+                if _config_pos: _config_kwargs.update(nargs="+")
+                else: _config_kwargs.update(action="append")
             if not _config_pos:
                 _config_kwargs.update(
                     dest=self._dest,
@@ -357,29 +1644,133 @@ class ArgumentParser(argparse.ArgumentParser):
                     **_strict_kwargs
                 ))
 
-    parse_known_args_orig = argparse.ArgumentParser.parse_known_args
+            # precompute map of option string:action used to scan args for config options
+            # (positional config args are handled by a subordinate parser instead)
+            if all(len(config_action.option_strings)>0 for config_action in self._config_actions):
+                self._config_scanner = {
+                    option_string: config_action for config_action in self._config_actions for option_string in config_action.option_strings
+                }
 
-    def _suppress_required(self, actions):
-        required = []
-        for action in actions:
-            if action.required:
-                action.required = False
-                required.append(action)
-        return required
+    parse_known_args_orig = argparse.ArgumentParser.parse_known_args
 
-    # this should take the list returned by the previous function
-    def _restore_required(self, actions):
+    # get a view of the parser in which the provided actions are not required
+    # (shallow copy with copies of the actions, so the shared actions are not modified)
+    def _without_required(self, actions):
+        import copy
+        required = {}
         for action in actions:
-            action.required = True
+            if action.required and action not in required:
+                optional = copy.copy(action)
+                optional.required = False
+                required[action] = optional
+        if len(required)==0: return self
+        view = copy.copy(self)
+        view._actions = [required.get(action, action) for action in self._actions]
+        return view
 
     # make sure it exists and is a MagiConfig
     def _check_namespace(self, namespace):
         if namespace is None: return MagiConfig()
+        elif isinstance(namespace,FrozenMagiConfig): return namespace.thaw()
         elif isinstance(namespace,MagiConfig): return namespace
         elif len(vars(namespace))==0: return MagiConfig()
         else: return MagiConfig(vars(namespace))
 
+    # get values of config options from args, without a full parse
+    # returns None if the args cannot be scanned (any errors will be reported by the full parse)
+    def _scan_config_args(self, args):
+        # positional config args: use a subordinate parser with just the config options (created once)
+        if self._config_scanner is None:
+            if self._config_only_parser is None:
+                config_only_parser = ArgumentParser(
+                    config_options = self.config_options,
+                    add_help = False,
+                    prefix_chars = self.prefix_chars,
+                )
+                # prevent exit on error() (from ConfigArgParse)
+                def error_method(self, message):
+                    raise argparse.ArgumentError(None, message)
+                config_only_parser.error = types.MethodType(error_method, config_only_parser)
+                self._config_only_parser = config_only_parser
+            # subordinate parser is not allowed to throw or exit
+            # if a required arg is missing, it will be checked later
+            try:
+                tmpspace, _ = self._config_only_parser.parse_known_args_orig(args=args)
+            except:
+                tmpspace = None
+            return tmpspace
+
+        def get_action(option_string):
+            action = self._config_scanner.get(option_string, None)
+            # in case the option string was removed from the parser
+            if action is not None and self._option_string_actions.get(option_string, None) is not action: action = None
+            return action
+
+        def is_option(arg_string):
+            return len(arg_string)>1 and arg_string[0] in self.prefix_chars and not (self._negative_number_matcher.match(arg_string) and not self._has_negative_number_optionals)
+
+        seen = set()
+        tmpspace = argparse.Namespace(**{action.dest: action.default for action in self._config_actions})
+        nargs = len(args)
+        i = 0
+        while i<nargs:
+            arg_string = args[i]
+            i += 1
+            # everything after '--' is positional
+            if arg_string=='--': break
+            if not is_option(arg_string): continue
+
+            explicit_arg = None
+            option_string = arg_string
+            if option_string not in self._option_string_actions and '=' in arg_string:
+                option_string, explicit_arg = arg_string.split('=',1)
+            action = get_action(option_string)
+            # other known options
+            if action is None and option_string in self._option_string_actions: continue
+            # single-dash option with attached value
+            if action is None and arg_string[1] not in self.prefix_chars:
+                action = get_action(arg_string[:2])
+                explicit_arg = arg_string[2:]
+            # unique abbreviation of a long option (allow_abbrev is not defined before python 3.5)
+            if action is None and getattr(self, "allow_abbrev", True) and arg_string[1] in self.prefix_chars:
+                option_prefix = arg_string.split('=',1)[0]
+                matches = [option_string for option_string in self._option_string_actions if option_string.startswith(option_prefix)]
+                if len(matches)==1:
+                    action = get_action(matches[0])
+                    explicit_arg = arg_string.split('=',1)[1] if '=' in arg_string else None
+            if action is None: continue
+
+            if action.nargs==0:
+                # store_true or store_false
+                if explicit_arg is not None: return None
+                setattr(tmpspace, action.dest, action.const)
+            else:
+                if explicit_arg is None:
+                    if i>=nargs or is_option(args[i]): return None
+                    explicit_arg = args[i]
+                    i += 1
+                # multiple config files
+                if isinstance(action, argparse._AppendAction):
+                    explicit_arg = list(getattr(tmpspace, action.dest) or []) + [explicit_arg]
+                setattr(tmpspace, action.dest, explicit_arg)
+            seen.add(action)
+
+        # missing required config options
+        if any(action.required and action not in seen for action in self._config_actions): return None
+
+        return tmpspace
+
     def parse_known_args(self, args=None, namespace=None):
+        stats, outer = _begin_stats(self._profile)
+        if stats is None: return self._parse_known_args_config(args, namespace, None)
+        # time since enclosing call's last phase (nested subparser call)
+        if not outer: stats.lap("parse")
+        try:
+            return self._parse_known_args_config(args, namespace, stats)
+        finally:
+            _end_stats(stats, outer)
+
+    def _parse_known_args_config(self, args, namespace, stats):
         if args is None: args = sys.argv[1:]
         else: args = list(args)
 
@@ -396,23 +1787,13 @@ class ArgumentParser(argparse.ArgumentParser):
 
         # fall back to default argparse behavior
         if self._config_actions is None:
-            return self.parse_known_args_orig(args=args,namespace=namespace)
-
-        # create a subordinate instance with just the config options
-        config_only_parser = ArgumentParser(
-            config_options = self.config_options,
-            add_help = False,
-        )
-        # prevent exit on error() (from ConfigArgParse)
-        def error_method(self, message):
-            raise argparse.ArgumentError(None, message)
-        config_only_parser.error = types.MethodType(error_method, config_only_parser)
-        # subordinate parser is not allowed to throw or exit
-        # if a required arg is missing, it will be checked later
-        try:
-            tmpspace, _ = config_only_parser.parse_known_args_orig(args=args)
-        except:
-            tmpspace = None
+            result = self.parse_known_args_orig(args=args,namespace=namespace)
+            if stats is not None: stats.lap("parse")
+            return result
+
+        # get values of config options without a full parse
+        tmpspace = self._scan_config_args(args)
+        if stats is not None: stats.lap("scan")
 
         # fall back to default argparse behavior
         # this will check config_required (config args still included with rest of args)
@@ -420,7 +1801,7 @@ class ArgumentParser(argparse.ArgumentParser):
             tmpspace, remaining_args = self.parse_known_args_orig(args=args,namespace=namespace)
         else:
             # get namespace as filled by config
-            namespace = self.parse_config(
+            namespace, provided_actions = self._parse_config(
                 getattr(tmpspace,self._dest),
                 getattr(tmpspace,self._obj_dest,self.config_options.obj),
                 getattr(tmpspace,self._strict_dest,self.config_options.strict),
@@ -428,12 +1809,10 @@ class ArgumentParser(argparse.ArgumentParser):
             )
 
             # call parse_known_args_orig again, with all args (supplying namespace from above)
-            tmpspace, remaining_args = self.parse_known_args_orig(args=args,namespace=namespace)
-
-            # restore required actions
-            self._restore_required(self._required)
-            # in case this runs again
-            self._required = []
+            # required args provided by config are not required on the command line
+            # (state is kept per call, so the parser can be used by multiple threads)
+            tmpspace, remaining_args = self._without_required(provided_actions).parse_known_args_orig(args=args,namespace=namespace)
+        if stats is not None: stats.lap("parse")
 
         # remove config option dests from namespace
         for dest in self._config_dests:
@@ -442,75 +1821,175 @@ class ArgumentParser(argparse.ArgumentParser):
         # finish
         return tmpspace, remaining_args
 
+    # asyncio interface: return awaitables, with config file loading and parsing done in a thread pool (see set_async_concurrency())
+    def parse_args_async(self, args=None, namespace=None):
+        if args is None: args = sys.argv[1:]
+        return _run_async(self.parse_args, args, namespace)
+
+    def parse_config_async(self, config_name, config_obj, config_strict, namespace=None):
+        return _run_async(self.parse_config, config_name, config_obj, config_strict, namespace)
+
+    # parse each list of args in argv_lists, as in parse_args()
+    # yields the resulting MagiConfig, or the exception raised, for each list (in order)
+    # each distinct config file/obj pair is only imported once
+    def parse_many(self, argv_lists, namespace_factory=None):
+        def error_method(self, message):
+            raise argparse.ArgumentError(None, message)
+        # errors are returned rather than exiting
+        # (using a shallow copy of the parser, so the parser itself is not modified)
+        import copy
+        parser = copy.copy(self)
+        parser.error = types.MethodType(error_method, parser)
+        parser._config_memo = {}
+        for args in argv_lists:
+            namespace = namespace_factory() if namespace_factory is not None else None
+            try:
+                result, argv = parser.parse_known_args(args, namespace)
+                if argv:
+                    raise argparse.ArgumentError(None, "unrecognized arguments: {}".format(' '.join(argv)))
+            # SystemExit can still come from subparsers or from help/version actions
+            except (Exception, SystemExit) as e:
+                result = e
+            yield result
+
     def parse_config(self, config_name, config_obj, config_strict, namespace=None):
+        return self._parse_config(config_name, config_obj, config_strict, namespace)[0]
+
+    # returns namespace and the regular actions for the dests provided by the config
+    def _parse_config(self, config_name, config_obj, config_strict, namespace=None):
+        stats, outer = _begin_stats(self._profile)
+        if stats is None: return self._parse_config_stats(config_name, config_obj, config_strict, namespace, None)
+        try:
+            return self._parse_config_stats(config_name, config_obj, config_strict, namespace, stats)
+        finally:
+            _end_stats(stats, outer)
+
+    def _parse_config_stats(self, config_name, config_obj, config_strict, namespace, stats):
         # in case used standalone
         namespace = self._check_namespace(namespace)
 
-        # import config as module
-        # (from configurati)
-        module_id = str(uuid.uuid4())
-        module = imp.load_source(module_id, os.path.abspath(config_name))
-        config = _rgetattr(module,config_obj)
-
-        # handle values in sub-configs by restoring dots in keys
-        def flatten_vars(config,pre=""):
-            flat_vars = {}
-            for attr,val in six.iteritems(vars(config)):
-                if isinstance(val,MagiConfig):
-                    flat_vars.update(flatten_vars(val,attr+"."))
-                else:
-                    flat_vars[pre+attr] = val
-            return flat_vars
+        # import config(s) (cached if unchanged since last import)
+        config_names = config_name if isinstance(config_name,list) else [config_name]
+        configs = _import_configs(config_names, config_obj, self._config_memo)
+        if stats is not None:
+            stats.lap("load")
+            stats.count("configs", len(config_names))
+            stats.count("config_bytes", sum(os.path.getsize(name) for name in config_names))
+
+        # snapshot values were already converted by a parser with the same schema
+        # multiple configs: values from later configs take precedence
+        converted = True
+        flat_vars = {}
+        for config in configs:
+            if isinstance(config,_ConfigSnapshot):
+                config_vars = config.values
+                converted = converted and config.schema==self._get_schema_hash()
+            else:
+                config_vars = _flatten_vars(config)
+                converted = False
+            # (snapshot values are shared, so not modified)
+            if len(configs)==1: flat_vars = config_vars
+            else: flat_vars.update(config_vars)
+        if stats is not None:
+            stats.lap("flatten")
+            stats.count("keys", len(flat_vars))
 
         # loop over vars(config) to populate namespace
         unknown_attrs = []
-        self._required = []
-        flat_vars = flatten_vars(config)
-        possible_required_actions = []
-        for attr,val in six.iteritems(flat_vars):
-            if attr in self._dests_actions or attr in self._config_only:
-                tmp = val
-                # check type if uniquely provided (and not None)
-                if (len(self._dests_actions[attr])==1 or len(set([action.type for action in self._dests_actions[attr]]))==1) and self._dests_actions[attr][0].type is not None:
-                    # use _get_values() rather than _get_value() to handle nargs cases; also enforces choices if any
-                    tmp_action = self._dests_actions[attr][0]
-                    # argparse does not apply type or choice checks to default args
-                    if tmp==tmp_action.default:
-                        pass
-                    # nargs=0 is usually _StoreTrueAction or _StoreFalseAction:
-                    # _get_values() expects an empty list for those, but we want to check the type of the provided value
-                    elif isinstance(tmp_action,argparse._StoreTrueAction) or isinstance(tmp_action,argparse._StoreFalseAction):
-                        tmp = bool(tmp)
-                    # generically handle any other cases with nargs=0
-                    elif tmp_action.nargs==0:
-                        if tmp_action.type: tmp = tmp_action.type(tmp)
-                    else:
-                        # _get_values() expects a list
-                        if not isinstance(tmp,list): tmp = [tmp]
-                        tmp = self._get_values(tmp_action,tmp)
-                setattr(namespace,attr,tmp)
-                possible_required_actions.extend(self._dests_actions[attr])
-            else:
+        provided_actions = []
+        for attr,val in _iteritems(flat_vars):
+            conversion = self._get_conversion(attr)
+            if conversion is _unknown_dest:
                 unknown_attrs.append(attr)
-        # remove required attr from associated actions
-        self._required = self._suppress_required(possible_required_actions)
+                continue
+            convert, actions = conversion
+            if convert is not None and not converted:
+                val = convert(val)
+                if stats is not None: stats.count("conversions")
+            setattr(namespace,attr,val)
+            provided_actions.extend(actions)
+        if stats is not None:
+            stats.lap("convert")
+            stats.count("unknown_attrs", len(unknown_attrs))
 
         # check missing required config-only args
-        config_only_missing = set([dest for dest,action in six.iteritems(self._config_only) if action.required]) - set([attr for attr in flat_vars])
+        config_only_missing = set([dest for dest,action in _iteritems(self._config_only) if action.required]) - set([attr for attr in flat_vars])
         if len(config_only_missing)>0:
             raise MagiConfigError("Imported config missing required attributes: "+','.join(sorted(list(config_only_missing))))
 
         # check strict
         if config_strict and len(unknown_attrs)>0:
             raise MagiConfigError("Imported config contained unknown attributes: "+','.join(unknown_attrs))
-
-        return namespace
+        if stats is not None: stats.lap("check")
+
+        return namespace, provided_actions
+
+    # get (converter, actions) for dest, compiled on first use
+    # converter is None if values are used as provided; actions are the regular actions for the dest
+    def _get_conversion(self, dest):
+        conversion = self._conversion_plan.get(dest, None)
+        if conversion is None:
+            if dest in self._dests_actions:
+                actions = list(self._dests_actions[dest])
+                convert = None
+                # check type if uniquely provided (and not None)
+                if (len(actions)==1 or len(set([action.type for action in actions]))==1) and actions[0].type is not None:
+                    convert = self._get_converter(actions[0])
+                conversion = (convert, actions)
+            elif dest in self._config_only:
+                conversion = (None, [])
+            else:
+                conversion = _unknown_dest
+            self._conversion_plan[dest] = conversion
+        return conversion
+
+    # hash of dests and their types, to check if a snapshot was written by an equivalent parser
+    # (stored with the conversion plan, so invalidated at the same time)
+    def _get_schema_hash(self):
+        schema = self._conversion_plan.get(_schema_key, None)
+        if schema is None:
+            import hashlib
+            def describe(obj):
+                if obj is None: return None
+                return getattr(obj, "__module__", "")+"."+getattr(obj, "__name__", repr(obj))
+            hasher = hashlib.sha256()
+            for dest in sorted(self._dests_actions):
+                for action in self._dests_actions[dest]:
+                    choices = None if action.choices is None else sorted(repr(choice) for choice in action.choices)
+                    hasher.update(repr((dest, describe(action.__class__), describe(action.type), action.nargs, choices)).encode("utf-8"))
+            for dest in sorted(self._config_only):
+                hasher.update(repr((dest, "config_only")).encode("utf-8"))
+            schema = hasher.digest()
+            self._conversion_plan[_schema_key] = schema
+        return schema
+
+    def _get_converter(self, action):
+        # nargs=0 is usually _StoreTrueAction or _StoreFalseAction:
+        # _get_values() expects an empty list for those, but we want to check the type of the provided value
+        if isinstance(action,argparse._StoreTrueAction) or isinstance(action,argparse._StoreFalseAction):
+            convert_value = bool
+        # generically handle any other cases with nargs=0
+        elif action.nargs==0:
+            convert_value = action.type
+        else:
+            # use _get_values() rather than _get_value() to handle nargs cases; also enforces choices if any
+            def convert_value(val):
+                # _get_values() expects a list
+                if not isinstance(val,list): val = [val]
+                return self._get_values(action,val)
+
+        def convert(val):
+            # argparse does not apply type or choice checks to default args
+            # (default checked when called, in case it changes)
+            if _values_equal(val, action.default): return val
+            return convert_value(val)
+        return convert
 
     # allow modifying options for config args
     def set_config_options(self, **kwargs):
         # modify config options
         if self.config_options is None: self.config_options = MagiConfigOptions()
-        for key,val in six.iteritems(kwargs):
+        for key,val in _iteritems(kwargs):
             if hasattr(self.config_options,key): setattr(self.config_options,key,val)
             else: raise MagiConfigError("Attempt to set invalid config option: "+key)
 
@@ -527,11 +2006,24 @@ class ArgumentParser(argparse.ArgumentParser):
         self._init_config()
 
     # write namespace into file using config_obj
-    def write_config(self, namespace, filename, obj=None, attr_imports=None, class_imports=None, attr_reprs=None, class_reprs=None, strict=False):
+    def write_config(self, namespace, filename, obj=None, attr_imports=None, class_imports=None, attr_reprs=None, class_reprs=None, strict=False, strict_workers=None, array_threshold=None):
+        if obj is None:
+            if self.config_options is not None: obj = self.config_options.obj
+            else: obj = "config"
+        namespace.write(filename, obj, attr_imports, class_imports, attr_reprs, class_reprs, strict, strict_workers, array_threshold)
+
+    # write parsed namespace into binary snapshot, which can be used in place of a config file
+    # (config arg dests are omitted)
+    def write_snapshot(self, namespace, filename, obj=None):
         if obj is None:
             if self.config_options is not None: obj = self.config_options.obj
             else: obj = "config"
-        namespace.write(filename, obj, attr_imports, class_imports, attr_reprs, class_reprs, strict)
+        # (copy, since the flattened vars of a FlatMagiConfig are its storage)
+        values = dict(_flatten_vars(namespace))
+        if self.config_options is not None:
+            for dest in [self.config_options.dest, self.config_options.obj_dest, self.config_options.strict_dest]:
+                values.pop(dest, None)
+        _write_snapshot(filename, self._get_schema_hash(), obj, values)
 
     # add config-only arguments
     # args: no default value, not required
@@ -547,7 +2039,7 @@ class ArgumentParser(argparse.ArgumentParser):
         self._ignore_conflict_config_only = True
         for dest in args:
             self.add_config_argument(dest)
-        for dest,default in six.iteritems(kwargs):
+        for dest,default in _iteritems(kwargs):
             if default is None:
                 self.add_config_argument(dest, required=True)
             else:
@@ -624,6 +2116,7 @@ class ArgumentParser(argparse.ArgumentParser):
 
         # add to actions list
         self._config_only[action.dest] = action
+        self._conversion_plan.clear()
         action.container = self
 
         return action
@@ -631,6 +2124,7 @@ class ArgumentParser(argparse.ArgumentParser):
     def remove_config_argument(self, arg):
         if arg in self._config_only:
             self._config_only.pop(arg)
+            self._conversion_plan.clear()
         else:
             self.error("attempt to remove unrecognized config-only argument: {}".format(arg))
 
@@ -657,6 +2151,7 @@ class ArgumentParser(argparse.ArgumentParser):
                     # remove only positional
                     if len(action.option_strings)==0:
                         self._dests_actions[arg].remove(action)
+                self._conversion_plan.clear()
                 found = True
         if not found:
             self.error("attempt to remove unrecognized argument: {}".format(arg))
@@ -683,7 +2178,7 @@ class ArgumentParser(argparse.ArgumentParser):
         if len(self._config_only)>0 and self._config_only_help:
             formatter.start_section("config-only arguments")
             # get list of (dummy) actions
-            config_only_actions = [action for dest,action in six.iteritems(self._config_only)]
+            config_only_actions = [action for dest,action in _iteritems(self._config_only)]
             formatter.add_arguments(config_only_actions)
             formatter.end_section()
 
@@ -693,22 +2188,170 @@ class ArgumentParser(argparse.ArgumentParser):
         # determine help from format above
         return formatter.format_help()
 
-# updates to subparsers
-argparse._SubParsersAction.add_parser_orig = argparse._SubParsersAction.add_parser
-def add_parser_new(self, name, **kwargs):
-    if six.PY2:
+# dotted keys that changed between namespaces in ConfigWatcher
+ConfigChanges = collections.namedtuple("ConfigChanges", ["added", "removed", "modified"])
+
+# reload config file when it (or any config file it imports) changes
+# files are polled (stat only) every interval seconds when started, or whenever check() is called
+# reload happens once the files have not changed for debounce seconds
+class ConfigWatcher(object):
+    def __init__(self, parser, config_name, config_obj=None, config_strict=None, namespace_factory=None, interval=1.0, debounce=0.5):
+        self.parser = parser
+        self.config_name = config_name
+        # same defaults as parser
+        if config_obj is None: config_obj = parser.config_options.obj if parser.config_options is not None else "config"
+        if config_strict is None: config_strict = parser.config_options.strict if parser.config_options is not None else False
+        self.config_obj = config_obj
+        self.config_strict = config_strict
+        self.namespace_factory = namespace_factory
+        self.interval = interval
+        self.debounce = debounce
+        self.callbacks = []
+        self.error = None
+        self._path = os.path.abspath(config_name)
+        # module name:file for config files imported by the config file
+        self._dependencies = {}
+        # module name:module (or file) for imported config files that were executed again
+        self._overrides = {}
+        self._stamps = None
+        self._pending = None
+        self._pending_since = None
+        import threading
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.namespace = self._load()
+        self._stamps = self._get_stamps()
+
+    # callback(namespace, changes), where changes is a ConfigChanges tuple
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self.callbacks.remove(callback)
+
+    def _get_stamps(self):
+        stamps = {}
+        for path in [self._path]+sorted(self._dependencies.values()):
+            try:
+                stat = os.stat(path)
+                stamps[path] = (getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def _load(self):
+        namespace = self.namespace_factory() if self.namespace_factory is not None else None
+        modules_before = set(sys.modules)
+        # config file is executed (rather than taken from the cache), to find the modules it imports
+        # (including modules that were already imported, e.g. by an earlier parse of the same file)
+        _config_cache.evict(self._path)
+        imported = []
+        _import_tracking.names = imported
+        _import_tracking.overrides = self._overrides
+        try:
+            namespace = self.parser.parse_config(self.config_name, self.config_obj, self.config_strict, namespace)
+        finally:
+            _import_tracking.names = None
+            _import_tracking.overrides = None
+        # track config files imported by the config file, or first imported while executing it:
+        # python files in the directory of the config file (or its subdirectories), except magiconfig itself
+        config_dir = os.path.join(os.path.dirname(self._path), "")
+        for name in (set(sys.modules) - modules_before) | set(imported):
+            module = self._overrides.get(name, sys.modules.get(name, None))
+            module_file = module if isinstance(module, str) else getattr(module, "__file__", None)
+            if module_file is None: continue
+            if module_file.endswith((".pyc",".pyo")): module_file = module_file[:-1]
+            module_file = os.path.abspath(module_file)
+            if module_file.endswith(".py") and module_file.startswith(config_dir) and module_file not in (self._path, _module_file):
+                self._dependencies[name] = module_file
+        return namespace
+
+    # check files once; returns True if config was reloaded
+    def check(self):
+        with self._lock:
+            stamps = self._get_stamps()
+            if stamps==self._stamps:
+                self._pending = None
+                return False
+            # debounce: wait for files to stop changing
+            now = time.time()
+            if stamps!=self._pending:
+                self._pending = stamps
+                self._pending_since = now
+            if now-self._pending_since<self.debounce:
+                return False
+            self._pending = None
+
+            changed = [path for path in stamps if stamps[path]!=self._stamps.get(path)]
+            dependencies = self._dependencies
+            if any(path!=self._path for path in changed):
+                # imported config files are executed again (all of them, in case they import each other),
+                # as throwaway modules provided only to the config file, so sys.modules is not modified
+                if _PY2:
+                    for name in self._dependencies:
+                        sys.modules.pop(name, None)
+                else:
+                    self._overrides = dict(self._dependencies)
+                self._dependencies = {}
+            try:
+                namespace = self._load()
+            except Exception as e:
+                # keep previous namespace (and watched files) until next change
+                self._dependencies.update(dependencies)
+                self._stamps = self._get_stamps()
+                self.error = e
+                return False
+            self.error = None
+            self._stamps = self._get_stamps()
+
+            old_vars = _flatten_vars(self.namespace)
+            new_vars = _flatten_vars(namespace)
+            changes = ConfigChanges(
+                sorted(set(new_vars)-set(old_vars)),
+                sorted(set(old_vars)-set(new_vars)),
+                sorted(key for key in set(old_vars) & set(new_vars) if not _values_equal(old_vars[key], new_vars[key])),
+            )
+            self.namespace = namespace
+        for callback in self.callbacks:
+            callback(namespace, changes)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    # poll in background thread
+    def start(self):
+        if self._thread is None:
+            import threading
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+# updates to subparsers (python 3 already supports aliases)
+if _PY2:
+    argparse._SubParsersAction.add_parser_orig = argparse._SubParsersAction.add_parser
+    def add_parser_new(self, name, **kwargs):
         # taken from python3 version
         aliases = kwargs.pop('aliases', ())
 
-    parser = self.add_parser_orig(name,**kwargs)
+        parser = self.add_parser_orig(name,**kwargs)
 
-    if six.PY2:
         # make parser available under aliases also
         for alias in aliases:
             self._name_parser_map[alias] = parser
 
-    return parser
-argparse._SubParsersAction.add_parser = add_parser_new
+        return parser
+    argparse._SubParsersAction.add_parser = add_parser_new
 
 # add all public classes and constants from argparse namespace to this namespace to be interchangeable
 # (from ConfigArgParse)
@@ -27,7 +27,7 @@ setuptools.setup(
     license="MIT",
     keywords="config, configuration, argparse, parameters, magiconfig",
     install_requires=[
-        "six",
+        "six; python_version<'3'",
     ],
     include_package_data=True,
 )
@@ -0,0 +1,277 @@
+import magiconfig
+import argparse
+import six
+import sys, os
+import json
+import platform
+import shutil
+import tempfile
+import timeit
+from collections import OrderedDict
+
+# usage: python tests/benchmark_magiconfig.py [-o results.json] [-c previous_results.json]
+# (see --help for other options)
+
+# each benchmark measures magiconfig for one scenario and size (setup() and teardown() are not timed)
+# baseline() returns an equivalent function for plain argparse, or None if there is no equivalent
+class MagiConfigBenchmark(object):
+    # default sizes, overridden by --sizes
+    sizes = [10, 100, 1000]
+
+    def __init__(self, size, tmpdir):
+        self.size = size
+        self.tmpdir = tmpdir
+
+    def setup(self):
+        pass
+
+    def run(self):
+        pass
+
+    # undo global changes from setup()
+    def teardown(self):
+        pass
+
+    def baseline(self):
+        return None
+
+    def params(self):
+        return OrderedDict([("size", self.size)])
+
+def add_options(parser, n):
+    for i in range(n):
+        parser.add_argument("--opt{}".format(i), dest="opt{}".format(i), type=int, default=0)
+    return parser
+
+def make_config_file(filename, n, depth, obj="config"):
+    # keys are spread over sub-configs up to the given depth
+    with open(filename,'w') as outfile:
+        outfile.write("from magiconfig import MagiConfig\n")
+        outfile.write("{} = MagiConfig()\n".format(obj))
+        prefixes = [obj]
+        for level in range(1, depth):
+            prefix = prefixes[-1]+".sub{}".format(level)
+            outfile.write("{} = MagiConfig()\n".format(prefix))
+            prefixes.append(prefix)
+        for i in range(n):
+            outfile.write("{}.opt{} = {}\n".format(prefixes[i%depth], i, i))
+    return [".".join(prefixes[i%depth].split(".")[1:]+["opt{}".format(i)]) for i in range(n)]
+
+class bench_parse_args(MagiConfigBenchmark):
+    def setup(self):
+        self.parser = add_options(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()), self.size)
+        self.args = [arg for i in range(0, self.size, 2) for arg in ["--opt{}".format(i), str(i)]]
+
+    def run(self):
+        self.parser.parse_args(self.args)
+
+    def baseline(self):
+        parser = add_options(argparse.ArgumentParser(), self.size)
+        return lambda: parser.parse_args(self.args)
+
+class bench_parse_config(MagiConfigBenchmark):
+    depth = 1
+
+    def setup(self):
+        filename = os.path.join(self.tmpdir, "flat_{}_{}.py".format(self.size, self.depth))
+        self.dests = make_config_file(filename, self.size, self.depth)
+        self.parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions())
+        for dest in self.dests:
+            self.parser.add_argument("--"+dest, dest=dest, type=int, default=0)
+        self.args = ["-C", filename]
+
+    # config file is imported each time
+    def run(self):
+        magiconfig.clear_config_cache()
+        self.parser.parse_args(self.args)
+
+    # same values provided on the command line
+    def baseline(self):
+        parser = argparse.ArgumentParser()
+        for dest in self.dests:
+            parser.add_argument("--"+dest, dest=dest, type=int, default=0)
+        args = [arg for i,dest in enumerate(self.dests) for arg in ["--"+dest, str(i)]]
+        return lambda: parser.parse_args(args)
+
+    def params(self):
+        return OrderedDict([("size", self.size), ("depth", self.depth)])
+
+class bench_parse_config_nested(bench_parse_config):
+    depth = 5
+
+class bench_parse_config_cached(bench_parse_config):
+    def setup(self):
+        bench_parse_config.setup(self)
+        magiconfig.set_config_cache_size(128)
+
+    def run(self):
+        self.parser.parse_args(self.args)
+
+    # back to the default (disabled)
+    def teardown(self):
+        magiconfig.set_config_cache_size(0)
+
+class bench_config_obj(MagiConfigBenchmark):
+    def setup(self):
+        filename = os.path.join(self.tmpdir, "objs_{}.py".format(self.size))
+        with open(filename,'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\n")
+            for k in range(self.size):
+                outfile.write("config{0} = MagiConfig(foo={0}, bar='bar{0}')\n".format(k))
+        self.parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(obj_args=["-O","--obj"]))
+        self.parser.add_argument("--foo", type=int, default=0)
+        self.parser.add_argument("--bar", type=str, default="")
+        self.args = ["-C", filename, "-O", "config{}".format(self.size-1)]
+
+    def run(self):
+        magiconfig.clear_config_cache()
+        self.parser.parse_args(self.args)
+
+class bench_write(MagiConfigBenchmark):
+    strict = False
+
+    def setup(self):
+        self.config = magiconfig.MagiConfig(
+            values = [float(i)/3 for i in range(self.size)],
+            names = OrderedDict([("name{}".format(i), i) for i in range(self.size)]),
+            text = "x"*self.size,
+        )
+        self.filename = os.path.join(self.tmpdir, "write_{}.py".format(self.size))
+
+    def run(self):
+        self.config.write(self.filename, "config", strict=self.strict)
+
+    # writing the same reprs without checks or imports
+    def baseline(self):
+        def write():
+            with open(self.filename,'w') as outfile:
+                for attr,val in six.iteritems(vars(self.config)):
+                    outfile.write("config.{} = {}\n".format(attr, repr(val)))
+        return write
+
+    def params(self):
+        return OrderedDict([("size", self.size), ("strict", self.strict)])
+
+class bench_write_strict(bench_write):
+    strict = True
+
+class bench_subparsers(MagiConfigBenchmark):
+    def setup(self):
+        self.parser = self.make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        self.args = ["cmd{}".format(self.size-1), "--opt", "1"]
+
+    def make_parser(self, parser):
+        subparsers = parser.add_subparsers(dest="cmd")
+        for i in range(self.size):
+            subparser = subparsers.add_parser("cmd{}".format(i))
+            subparser.add_argument("--opt", type=int, default=0)
+        return parser
+
+    def run(self):
+        self.parser.parse_args(self.args)
+
+    def baseline(self):
+        parser = self.make_parser(argparse.ArgumentParser())
+        return lambda: parser.parse_args(self.args)
+
+class bench_format_help(MagiConfigBenchmark):
+    def setup(self):
+        self.parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions())
+        for i in range(self.size):
+            self.parser.add_config_argument("opt{}".format(i), type=int, default=0, help="option {}".format(i))
+
+    def run(self):
+        self.parser.format_help()
+
+    # same number of regular args
+    def baseline(self):
+        parser = argparse.ArgumentParser()
+        for i in range(self.size):
+            parser.add_argument("--opt{}".format(i), dest="opt{}".format(i), type=int, default=0, help="option {}".format(i))
+        return parser.format_help
+
+# best time per call in seconds, from several repeats
+def measure(func, repeat, min_time):
+    # number of calls per repeat, so each repeat takes at least min_time
+    number = 1
+    while True:
+        t = timeit.timeit(func, number=number)
+        if t>=min_time or number>=1000000: break
+        number *= 10
+    return min([t]+timeit.repeat(func, number=number, repeat=repeat-1))/number
+
+def run_benchmarks(names, sizes, repeat, min_time):
+    benchmarks = OrderedDict([(subcl.__name__, subcl) for subcl in all_subclasses(MagiConfigBenchmark)])
+    results = []
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name,bench_class in six.iteritems(benchmarks):
+            if names and name not in names: continue
+            for size in (sizes or bench_class.sizes):
+                bench = bench_class(size, tmpdir)
+                bench.setup()
+                try:
+                    result = OrderedDict([("name", name), ("params", bench.params())])
+                    result["magiconfig"] = measure(bench.run, repeat, min_time)
+                    baseline = bench.baseline()
+                    result["argparse"] = measure(baseline, repeat, min_time) if baseline is not None else None
+                finally:
+                    bench.teardown()
+                results.append(result)
+                six.print_(format_result(result))
+    finally:
+        shutil.rmtree(tmpdir)
+    return results
+
+def all_subclasses(cls):
+    for subcl in cls.__subclasses__():
+        yield subcl
+        for subsubcl in all_subclasses(subcl):
+            yield subsubcl
+
+def result_key(result):
+    return (result["name"], json.dumps(result["params"], sort_keys=True))
+
+def format_result(result, previous=None):
+    line = "{:<28} {:<32} magiconfig {:>10.3f} ms".format(result["name"], json.dumps(result["params"]), result["magiconfig"]*1000)
+    if result["argparse"] is not None:
+        line += "  argparse {:>10.3f} ms  ratio {:>6.2f}".format(result["argparse"]*1000, result["magiconfig"]/result["argparse"])
+    if previous is not None:
+        line += "  vs previous {:>6.2f}".format(result["magiconfig"]/previous["magiconfig"])
+    return line
+
+if __name__=="__main__":
+    parser = magiconfig.ArgumentParser(description="benchmarks for magiconfig, with plain argparse as the baseline")
+    parser.add_argument("-n","--names", type=str, default=[], nargs='*', help="benchmarks to run (default: all)")
+    parser.add_argument("-s","--sizes", type=int, default=[], nargs='*', help="sizes to run (default: per benchmark)")
+    parser.add_argument("-r","--repeat", type=int, default=5, help="number of repeats (best is kept)")
+    parser.add_argument("-t","--min-time", dest="min_time", type=float, default=0.1, help="minimum time per repeat (s)")
+    parser.add_argument("-o","--output", type=str, default=None, help="save results to JSON file")
+    parser.add_argument("-c","--compare", type=str, default=None, help="compare with results from JSON file (e.g. from another version)")
+    parser.add_argument("--threshold", type=float, default=1.1, help="ratio vs previous results above which a benchmark is reported as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.names, args.sizes, args.repeat, args.min_time)
+
+    if args.output is not None:
+        with open(args.output,'w') as outfile:
+            json.dump(OrderedDict([
+                ("magiconfig", magiconfig.__version__),
+                ("python", platform.python_version()),
+                ("results", results),
+            ]), outfile, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare,'r') as infile:
+            previous = json.load(infile)
+        previous_results = dict((result_key(result), result) for result in previous["results"])
+        six.print_("\nComparison with magiconfig {} (python {}):".format(previous["magiconfig"], previous["python"]))
+        regressions = []
+        for result in results:
+            prev = previous_results.get(result_key(result), None)
+            if prev is None: continue
+            six.print_(format_result(result, prev))
+            if result["magiconfig"]/prev["magiconfig"]>args.threshold: regressions.append(result)
+        if len(regressions)>0:
+            six.print_("Regressions: "+', '.join(result["name"]+json.dumps(result["params"]) for result in regressions))
+            sys.exit(1)
@@ -0,0 +1,16 @@
+from magiconfig import MagiConfig, LazyMagiConfig
+
+def make_config(bar):
+    cfg = MagiConfig()
+    cfg.bar = bar
+    return cfg
+
+def fail():
+    raise RuntimeError("should not be built")
+
+config = MagiConfig()
+config.a = LazyMagiConfig(make_config, 3)
+config.b = LazyMagiConfig(fail)
+
+nested = MagiConfig()
+nested.sub = LazyMagiConfig(make_config, 4)
@@ -0,0 +1,8 @@
+from magiconfig import FlatMagiConfig
+
+config = FlatMagiConfig()
+config.bar = 2
+config.foo = 2
+config.ipsum = False
+config.sub = FlatMagiConfig(bar = 3)
+setattr(config, "sub.deep.foo", 4)
@@ -0,0 +1,8 @@
+from magiconfig import MagiConfig
+
+common = MagiConfig()
+common.foo = 2
+common.ipsum = False
+common = common.freeze()
+
+config = common.with_(bar=2)
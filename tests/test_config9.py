@@ -0,0 +1,11 @@
+from magiconfig import MagiConfig, LayeredMagiConfig
+
+site = MagiConfig()
+site.foo = 2
+site.bar = 1
+site.ipsum = False
+
+job = MagiConfig()
+job.bar = 2
+
+config = LayeredMagiConfig(job, site)
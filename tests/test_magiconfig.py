@@ -1,7 +1,7 @@
 import magiconfig
 import argparse
 import six
-import sys
+import sys, os
 import types
 from collections import OrderedDict
 
@@ -826,6 +826,883 @@ class test_config_default_type(MagiConfigTest):
         args = parser.parse_args(args=["-C","tests/test_config5.py"])
         return args.extra==None
 
+class test_config_cache(MagiConfigTest):
+    def test(self):
+        magiconfig.clear_config_cache()
+        magiconfig.set_config_cache_size(128)
+        try:
+            parser = make_parser()
+            args1 = parser.parse_args(args=["-C","tests/test_config.py"])
+            args2 = parser.parse_args(args=["-C","tests/test_config.py"])
+            info = magiconfig.config_cache_info()
+            return args1==args2 and info.hits==1 and info.misses==1 and info.currsize==1
+        finally:
+            magiconfig.set_config_cache_size(0)
+
+class test_config_cache_default(MagiConfigTest):
+    def test(self):
+        # disabled by default: values are not shared between parses
+        with open("config_tmp22.py",'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nconfig = MagiConfig(bar = 1, items = [1, 2])\n")
+        parser = make_parser()
+        parser.add_config_argument("items")
+        args1 = parser.parse_args(args=["-C","config_tmp22.py"])
+        args1.items.append(99)
+        args2 = parser.parse_args(args=["-C","config_tmp22.py"])
+        return args2.items==[1, 2] and magiconfig.config_cache_info().maxsize==0
+
+class test_config_cache_modified(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        with open("config_tmp8.py",'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nconfig = MagiConfig()\nconfig.bar = 1")
+        args1 = parser.parse_args(args=["-C","config_tmp8.py"])
+        # size changes even if mtime resolution is coarse
+        with open("config_tmp8.py",'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nconfig = MagiConfig()\nconfig.bar = 10")
+        args2 = parser.parse_args(args=["-C","config_tmp8.py"])
+        return args1.bar==1.0 and args2.bar==10.0
+
+class test_config_cache_size(MagiConfigTest):
+    def test(self):
+        magiconfig.clear_config_cache()
+        magiconfig.set_config_cache_size(1)
+        try:
+            parser = make_parser()
+            parser.parse_args(args=["-C","tests/test_config.py"])
+            parser.parse_args(args=["-C","tests/test_config5.py"])
+            parser.parse_args(args=["-C","tests/test_config.py"])
+            info = magiconfig.config_cache_info()
+            return info.hits==0 and info.misses==3 and info.currsize==1
+        finally:
+            magiconfig.set_config_cache_size(0)
+
+class test_config_module_memory(MagiConfigTest):
+    def test(self):
+        import gc
+        parser = make_parser()
+        # bypass the cache so every parse executes the config file
+        magiconfig.set_config_cache_size(0)
+        def parse(n):
+            for i in range(n):
+                parser.parse_config("tests/test_config.py", "config", False)
+            gc.collect()
+        try:
+            if six.PY2:
+                parse(100)
+                nmodules = len(sys.modules)
+                parse(10000)
+                return len(sys.modules)==nmodules
+            import tracemalloc
+            parse(100)
+            nmodules = len(sys.modules)
+            tracemalloc.start()
+            parse(100)
+            before = tracemalloc.get_traced_memory()[0]
+            parse(10000)
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            # no growth proportional to the number of parses
+            return len(sys.modules)==nmodules and after-before<100000
+        finally:
+            magiconfig.set_config_cache_size(0)
+
+class test_config_module_retention(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        magiconfig.clear_config_cache()
+        magiconfig.set_config_module_retention(True)
+        try:
+            nmodules = len(sys.modules)
+            parser.parse_config("tests/test_config.py", "config", False)
+            return len(sys.modules)==nmodules+1
+        finally:
+            magiconfig.set_config_module_retention(False)
+
+class test_config_bytecode_cache(MagiConfigTest):
+    def test(self):
+        # hash-based pyc files require python >= 3.7
+        if six.PY2: return True
+        import os, tempfile, shutil, marshal
+        cache_dir = tempfile.mkdtemp()
+        magiconfig.set_config_bytecode_cache(cache_dir)
+        try:
+            parser = make_parser()
+            magiconfig.clear_config_cache()
+            args1 = parser.parse_args(args=["-C","tests/test_config.py"])
+            cache_files = os.listdir(cache_dir)
+            if len(cache_files)!=1: return False
+            # replace cached code while keeping the header: getting the new value shows that compilation was skipped
+            cache_path = os.path.join(cache_dir, cache_files[0])
+            with open(cache_path,'rb') as infile:
+                header = infile.read()[:16]
+            code = compile("from magiconfig import MagiConfig\nconfig = MagiConfig()\nconfig.bar = 3", "tests/test_config.py", "exec")
+            with open(cache_path,'wb') as outfile:
+                outfile.write(header+marshal.dumps(code))
+            magiconfig.clear_config_cache()
+            args2 = parser.parse_args(args=["-C","tests/test_config.py"])
+            return args1.bar==2.0 and args2.bar==3.0
+        finally:
+            magiconfig.set_config_bytecode_cache(None)
+            shutil.rmtree(cache_dir)
+
+class test_config_bytecode_cache_unwritable(MagiConfigTest):
+    def test(self):
+        # directory cannot be created inside a file
+        magiconfig.set_config_bytecode_cache("tests/test_config.py/cache")
+        try:
+            parser = make_parser()
+            magiconfig.clear_config_cache()
+            args = parser.parse_args(args=["-C","tests/test_config.py"])
+            return args.bar==2.0
+        finally:
+            magiconfig.set_config_bytecode_cache(None)
+
+class test_config_scan_forms(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        expected = magiconfig.MagiConfig(
+            bar = 2.0,
+            foo = '2',
+            ipsum = False,
+        )
+        forms = [
+            ["-C","tests/test_config.py"],
+            ["-Ctests/test_config.py"],
+            ["--config","tests/test_config.py"],
+            ["--config=tests/test_config.py"],
+            ["--conf","tests/test_config.py"],
+            ["-f","3","-C","tests/test_config.py","-f","2"],
+        ]
+        results = [parser.parse_args(args=args)==expected for args in forms]
+        # config options are scanned without creating another parser
+        return all(results) and parser._config_only_parser is None
+
+class test_config_scan_after_separator(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        parser.add_argument("rest", nargs="*")
+        args = parser.parse_args(args=["-b","1","--","-C","tests/test_config.py"])
+        return args.bar==1.0 and args.rest==["-C","tests/test_config.py"]
+
+class test_config_scan_obj_strict(MagiConfigTest):
+    def test(self):
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(
+            obj_args=["-O","--obj"],
+            strict_args=["-S","--strict"],
+        )))
+        args = parser.parse_args(args=["-C","tests/test_config_sub.py","--obj=config.two","--strict"])
+        # unknown attribute "extra"
+        try:
+            parser.parse_args(args=["-C","tests/test_config3.py","-S"])
+        except magiconfig.MagiConfigError:
+            return args.bar==2.0
+        else:
+            return False
+
+class test_parse_many(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        magiconfig.clear_config_cache()
+        argv_lists = [
+            ["-C","tests/test_config.py"],
+            ["-C","tests/test_config.py","-f","3"],
+            ["-f","3"],
+            ["-C","tests/test_config5.py","-i"],
+            ["-C","tests/test_config.py","--unknown"],
+        ]
+        results = list(parser.parse_many(argv_lists, namespace_factory=lambda: magiconfig.MagiConfig(extra=1)))
+        expected = [
+            magiconfig.MagiConfig(bar=2.0, foo='2', ipsum=False, extra=1),
+            magiconfig.MagiConfig(bar=2.0, foo='3', ipsum=False, extra=1),
+            None,
+            magiconfig.MagiConfig(bar=2.0, foo='lorem', ipsum=True, extra=1),
+            None,
+        ]
+        # missing required arg, unrecognized arg
+        errors = isinstance(results[2], argparse.ArgumentError) and isinstance(results[4], argparse.ArgumentError)
+        # each config imported once
+        info = magiconfig.config_cache_info()
+        return all(result==exp for result,exp in zip(results,expected) if exp is not None) and errors and info.misses==2 and info.hits==0
+
+class test_lazy_obj(MagiConfigTest):
+    def test(self):
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(
+            obj_args=["-O","--obj"],
+        )))
+        # config.b raises an error if it is built
+        args = parser.parse_args(args=["-C","tests/test_config6.py","-O","config.a"])
+        return args.bar==3.0
+
+class test_lazy_nested(MagiConfigTest):
+    def test(self):
+        parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(
+            obj="nested",
+        ))
+        parser.add_argument("--bar", dest="sub.bar", type=float)
+        args = parser.parse_args(args=["-C","tests/test_config6.py"])
+        return args==magiconfig.MagiConfig(sub=magiconfig.MagiConfig(bar=4.0))
+
+class test_lazy_attr(MagiConfigTest):
+    def test(self):
+        def make_config():
+            return magiconfig.MagiConfig(foo=1)
+        config = magiconfig.MagiConfig(sub=magiconfig.LazyMagiConfig(make_config))
+        return config.sub.foo==1 and getattr(config,"sub.foo")==1 and config==magiconfig.MagiConfig(sub=magiconfig.MagiConfig(foo=1))
+
+class test_conversion_plan_invalidate(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        parser.set_config_options(strict=True)
+        results = []
+        # config contains "extra"
+        for i in range(2):
+            try:
+                parser.parse_args(args=["-C","tests/test_config5.py"])
+                results.append(False)
+            except magiconfig.MagiConfigError:
+                results.append(True)
+        parser.add_argument("--extra", dest="extra", default=1)
+        args = parser.parse_args(args=["-C","tests/test_config5.py"])
+        results.append(args.extra is None)
+        parser.remove_argument("--extra")
+        parser.add_config_argument("extra", default=1)
+        args = parser.parse_args(args=["-C","tests/test_config5.py"])
+        results.append(args.extra is None)
+        parser.remove_config_argument("extra")
+        try:
+            parser.parse_args(args=["-C","tests/test_config5.py"])
+            results.append(False)
+        except magiconfig.MagiConfigError:
+            results.append(True)
+        return all(results)
+
+class test_conversion_plan_type(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        args1 = parser.parse_args(args=["-C","tests/test_config.py"])
+        parser.remove_argument("-f")
+        parser.add_argument("-f","--foo", dest="foo", type=int, default=0)
+        args2 = parser.parse_args(args=["-C","tests/test_config.py"])
+        return args1.foo=='2' and args2.foo==2
+
+class test_deep_dests(MagiConfigTest):
+    def test(self):
+        parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(strict=True))
+        parser.add_argument("--c", dest="a.b.c", type=int)
+        config = magiconfig.MagiConfig(a=magiconfig.MagiConfig(b=magiconfig.MagiConfig(c="1")))
+        config.write("config_tmp9.py", "config")
+        args = parser.parse_args(args=["-C","config_tmp9.py"])
+        return args.a.b.c==1
+
+class test_flat_config(MagiConfigTest):
+    def test(self):
+        config = magiconfig.FlatMagiConfig(foo=1)
+        setattr(config, "sub.deep.bar", 2)
+        config.sub.baz = 3
+        expected = magiconfig.MagiConfig(foo=1, sub=magiconfig.MagiConfig(deep=magiconfig.MagiConfig(bar=2), baz=3))
+        results = [
+            config==expected,
+            list(vars(config))==["foo","sub"],
+            getattr(config, "sub.deep.bar")==2,
+            config.sub.deep.bar==2,
+            config._flat_vars()=={"foo": 1, "sub.deep.bar": 2, "sub.baz": 3},
+        ]
+        del config.sub.deep
+        results.append(config==magiconfig.MagiConfig(foo=1, sub=magiconfig.MagiConfig(baz=3)))
+        # assigning a view of the same storage (to itself, or to its own descendant)
+        config.sub = magiconfig.MagiConfig(x=1, y=2, empty=magiconfig.MagiConfig())
+        config.sub = config.sub
+        results.append(config==magiconfig.MagiConfig(foo=1, sub=magiconfig.MagiConfig(x=1, y=2, empty=magiconfig.MagiConfig())))
+        config.sub.x = config.sub
+        results.append(config.sub.x==magiconfig.MagiConfig(x=1, y=2, empty=magiconfig.MagiConfig()) and config._flat_vars()=={"foo": 1, "sub.x.x": 1, "sub.x.y": 2, "sub.y": 2})
+        return all(results)
+
+class test_flat_config_parse(MagiConfigTest):
+    def test(self):
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(
+            strict=True,
+        )))
+        parser.add_argument("--sub-bar", dest="sub.bar", type=float)
+        parser.add_argument("--sub-deep-foo", dest="sub.deep.foo", type=str)
+        args = parser.parse_args(args=["-C","tests/test_config7.py"])
+        expected = magiconfig.MagiConfig(
+            bar = 2.0,
+            foo = '2',
+            ipsum = False,
+            sub = magiconfig.MagiConfig(bar = 3.0, deep = magiconfig.MagiConfig(foo = '4')),
+        )
+        return args==expected
+
+class test_flat_config_obj(MagiConfigTest):
+    def test(self):
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(
+            obj="config.sub",
+        )))
+        parser.add_argument("--deep-foo", dest="deep.foo", type=int)
+        args = parser.parse_args(args=["-C","tests/test_config7.py"])
+        return args==magiconfig.MagiConfig(bar=3.0, foo='lorem', ipsum=False, deep=magiconfig.MagiConfig(foo=4))
+
+class test_frozen_config(MagiConfigTest):
+    def test(self):
+        config = magiconfig.MagiConfig(foo=1, sub=magiconfig.MagiConfig(bar=2, deep=magiconfig.MagiConfig(baz=3)))
+        frozen = config.freeze()
+        derived = frozen.with_({"sub.bar": 4}, extra=5)
+        results = [
+            frozen==config,
+            isinstance(frozen.sub.deep, magiconfig.FrozenMagiConfig),
+            derived==magiconfig.MagiConfig(foo=1, extra=5, sub=magiconfig.MagiConfig(bar=4, deep=magiconfig.MagiConfig(baz=3))),
+            # unchanged subtree is shared
+            derived.sub.deep is frozen.sub.deep,
+            hash(frozen)==hash(config.freeze()),
+            len(set([frozen, config.freeze(), derived]))==2,
+            derived.thaw()==derived and type(derived.thaw().sub) is magiconfig.MagiConfig,
+        ]
+        try:
+            frozen.foo = 2
+            results.append(False)
+        except magiconfig.MagiConfigError:
+            results.append(True)
+        return all(results)
+
+class test_frozen_config_parse(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        args = parser.parse_args(args=["-C","tests/test_config8.py"], namespace=magiconfig.FrozenMagiConfig())
+        expected = magiconfig.MagiConfig(
+            bar = 2.0,
+            foo = '2',
+            ipsum = False,
+        )
+        return args==expected
+
+class test_frozen_config_write(MagiConfigTest):
+    def test(self):
+        config = magiconfig.MagiConfig(foo='1', sub=magiconfig.MagiConfig(bar=2.0)).freeze()
+        config.write("config_tmp10.py", "config")
+        parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions())
+        parser.add_argument("--foo", dest="foo", type=str)
+        parser.add_argument("--bar", dest="sub.bar", type=float)
+        args = parser.parse_args(args=["-C","config_tmp10.py"])
+        return args==config
+
+class test_layered_config(MagiConfigTest):
+    def test(self):
+        site = magiconfig.MagiConfig(path="/data", dataset=magiconfig.MagiConfig(name="a", size=1))
+        campaign = magiconfig.MagiConfig(dataset=magiconfig.MagiConfig(size=2))
+        job = magiconfig.MagiConfig(input="x")
+        config = magiconfig.LayeredMagiConfig(job, campaign, site)
+        results = [
+            config.path=="/data",
+            config.dataset.size==2,
+            getattr(config, "dataset.name")=="a",
+            config==magiconfig.MagiConfig(input="x", path="/data", dataset=magiconfig.MagiConfig(name="a", size=2)),
+            type(config.flatten().dataset) is magiconfig.MagiConfig,
+        ]
+        # writes only affect the first layer
+        config.dataset.size = 3
+        results.extend([
+            config.dataset.size==3,
+            job==magiconfig.MagiConfig(input="x", dataset=magiconfig.MagiConfig(size=3)),
+            campaign.dataset.size==2,
+        ])
+        return all(results)
+
+class test_layered_config_parse(MagiConfigTest):
+    def test(self):
+        parser = make_parser()
+        args = parser.parse_args(args=["-C","tests/test_config9.py"])
+        expected = magiconfig.MagiConfig(
+            bar = 2.0,
+            foo = '2',
+            ipsum = False,
+        )
+        return args==expected
+
+class test_deep_join(MagiConfigTest):
+    def make_configs(self):
+        config1 = magiconfig.MagiConfig(foo=1, names=["Alice"], dataset=magiconfig.MagiConfig(name="a", size=1))
+        config2 = magiconfig.MagiConfig(foo=1, names=["Bob"], bar=2, dataset=magiconfig.MagiConfig(size=2, sub=magiconfig.MagiConfig(baz=3)))
+        return config1, config2
+
+    def test(self):
+        results = []
+        config1, config2 = self.make_configs()
+        conflicts = config1.deep_join(config2)
+        results.extend([
+            conflicts==["names","dataset.size"],
+            config1==magiconfig.MagiConfig(foo=1, names=["Alice"], bar=2, dataset=magiconfig.MagiConfig(name="a", size=1, sub=magiconfig.MagiConfig(baz=3))),
+            # nested configs are copied
+            config1.dataset.sub is not config2.dataset.sub,
+        ])
+        config1, config2 = self.make_configs()
+        config1.deep_join(config2, policy="other")
+        results.append(config1.dataset.size==2 and config1.names==["Bob"] and config1.dataset.name=="a")
+        config1, config2 = self.make_configs()
+        config1.deep_join(config2, policy="concat")
+        results.append(config1.names==["Alice","Bob"] and config1.dataset.size==1)
+        config1, config2 = self.make_configs()
+        config1.deep_join(config2, policy=lambda key, val1, val2: key)
+        results.append(config1.dataset.size=="dataset.size")
+        config1, config2 = self.make_configs()
+        try:
+            config1.deep_join(config2, policy="error")
+            results.append(False)
+        except magiconfig.MagiConfigError:
+            # unchanged
+            results.append(config1==self.make_configs()[0])
+        return all(results)
+
+class test_config_write_stream(MagiConfigTest):
+    def test(self):
+        results = []
+        config = magiconfig.MagiConfig(a = 1, z = OrderedDict([("x", 2)]))
+        config.b = magiconfig.MagiConfig(c = magiconfig.MagiConfig(d = "e"), f = [1.0])
+        config.b.g = magiconfig.LazyMagiConfig(magiconfig.MagiConfig, h = None)
+        config.write("config_tmp11.py", "config")
+        expected_config = '\n'.join([
+            "from magiconfig import MagiConfig",
+            "from collections import OrderedDict",
+            "",
+            "config = MagiConfig()",
+            "config.a = 1",
+            "config.b = MagiConfig()",
+            "config.b.c = MagiConfig()",
+            "config.b.c.d = 'e'",
+            "config.b.f = [1.0]",
+            "config.b.g = MagiConfig()",
+            "config.b.g.h = None",
+            "config.z = "+repr(config.z),
+        ])
+        with open("config_tmp11.py",'r') as infile:
+            results.append(infile.read()==expected_config)
+        # failed write leaves existing file unchanged
+        config.d = {}
+        config.d[1] = config.d
+        try:
+            config.write("config_tmp11.py", "config", strict=True)
+            results.append(False)
+        except magiconfig.MagiConfigError:
+            with open("config_tmp11.py",'r') as infile:
+                results.append(infile.read()==expected_config)
+        results.append(not any(name.startswith("config_tmp11.py.") for name in os.listdir(".")))
+        return all(results)
+
+class test_config_write_concurrent(MagiConfigTest):
+    def test(self):
+        import threading
+        # writers of the same file use separate temporary files
+        errors = []
+        def write(i):
+            try:
+                for j in range(20):
+                    magiconfig.MagiConfig(bar = float(i), values = list(range(1000))).write("config_tmp23.py", "config", strict="file")
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        parser = make_parser()
+        args = parser.parse_args(args=["-C","config_tmp23.py"])
+        leftover = [name for name in os.listdir(".") if name.startswith("config_tmp23.py.")]
+        return len(errors)==0 and args.bar in [0.0, 1.0, 2.0, 3.0] and len(leftover)==0
+
+class test_config_write_strict_modes(MagiConfigTest):
+    def test(self):
+        results = []
+        # falsy values and classes only imported in the written file
+        config = magiconfig.MagiConfig(a = 0, b = OrderedDict([("x", 2)]), c = [1, 2])
+        config.d = magiconfig.MagiConfig(e = [1, 2], f = "")
+        for strict,workers in [(True,None),(True,2),("file",None)]:
+            config.write("config_tmp12.py", "config", strict=strict, strict_workers=workers)
+            results.append(magiconfig._import_config("config_tmp12.py", "config")==config)
+        # self-referential object fails in all modes
+        config.g = {}
+        config.g[1] = config.g
+        for strict,workers in [(True,None),(True,2),("file",None)]:
+            try:
+                config.write("config_tmp12.py", "config", strict=strict, strict_workers=workers)
+                results.append(False)
+            except magiconfig.MagiConfigError as e:
+                results.append("config.g" in str(e))
+        return all(results)
+
+class test_config_write_imports_fast(MagiConfigTest):
+    def test(self):
+        results = []
+        config = magiconfig.MagiConfig(a = [float(i) for i in range(100000)], b = {"x": 1, "y": 2.0}, c = "abc")
+        imports = set()
+        for attr,val in six.iteritems(vars(config)):
+            imports.update(config._get_imports(attr, val, {}, {}))
+        results.append(len(imports)==0)
+        # class-specific imports still applied to entries
+        imports = set()
+        for attr,val in six.iteritems(vars(config)):
+            imports.update(config._get_imports(attr, val, {}, {float: lambda x: "import math", str: lambda x: None}))
+        results.append(imports==set(["import math"]))
+        # mixed types
+        config.d = [1, OrderedDict()]
+        results.append(config._get_imports("d", config.d, {}, {})==set(["from collections import OrderedDict"]))
+        try:
+            import numpy
+        except ImportError:
+            pass
+        else:
+            config.e = numpy.zeros((3,4))
+            results.append(config._get_imports("e", config.e, {}, {})==set(["from numpy import ndarray", "from numpy import float64"]))
+        return all(results)
+
+class test_config_write_imports_weak(MagiConfigTest):
+    def test(self):
+        import gc, weakref
+        with open("config_tmp24.py",'w') as outfile:
+            outfile.write("\n".join([
+                "from magiconfig import MagiConfig",
+                "class Point(object):",
+                "    def __repr__(self): return 'Point()'",
+                "config = MagiConfig(pt = Point())",
+                "",
+            ]))
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        parser.add_config_argument("pt")
+        args = parser.parse_args(args=["-C","config_tmp24.py","-b","1"])
+        config = magiconfig.MagiConfig(pt = args.pt)
+        config.write("config_tmp24_out.py", "config")
+        # memoized import discovery does not keep the class (and its module) alive
+        ref = weakref.ref(args.pt.__class__)
+        del args, config
+        gc.collect()
+        return ref() is None
+
+class test_config_write_arrays(MagiConfigTest):
+    def test(self):
+        try:
+            import numpy
+        except ImportError:
+            return True
+        results = []
+        config = magiconfig.MagiConfig(small = numpy.arange(3), bar = 1.0)
+        config.calib = magiconfig.MagiConfig(table = numpy.arange(100.).reshape(10,10))
+        small_reprs = {"small": lambda x: "array("+repr(x.tolist())+")"}
+        small_imports = {"small": lambda x: "from numpy import array"}
+        config.write("config_tmp13.py", "config", array_threshold=10, attr_reprs=small_reprs, attr_imports=small_imports)
+        with open("config_tmp13.py",'r') as infile:
+            results.append("config.calib.table = load_array('config_tmp13.config.calib.table.npy', __file__)" in infile.read())
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        parser.add_config_argument("small")
+        parser.add_config_argument("calib.table", default=numpy.zeros(3))
+        args = parser.parse_args(args=["-C","config_tmp13.py"])
+        results.extend([
+            isinstance(args.calib.table, numpy.memmap),
+            (args.calib.table==config.calib.table).all(),
+            (args.small==config.small).all(),
+        ])
+        # strict="file" checks the new arrays; failed check does not modify the existing file or arrays
+        config.write("config_tmp13.py", "config", array_threshold=10, attr_reprs=small_reprs, attr_imports=small_imports, strict="file")
+        config2 = magiconfig.MagiConfig(bar = 1.0, calib = magiconfig.MagiConfig(table = numpy.ones((10,10))))
+        for attr_reprs in [{"bar": lambda x: "2.0"}, {"table": lambda x: "None"}]:
+            try:
+                config2.write("config_tmp13.py", "config", array_threshold=10, attr_reprs=attr_reprs, strict="file")
+                results.append(False)
+            except magiconfig.MagiConfigError:
+                pass
+        magiconfig.clear_config_cache()
+        args = parser.parse_args(args=["-C","config_tmp13.py"])
+        results.append((args.calib.table==config.calib.table).all() and not any(name.endswith(".tmp") for name in os.listdir(".")))
+        del args
+        os.remove("config_tmp13.config.calib.table.npy")
+        return all(results)
+
+class test_config_snapshot(MagiConfigTest):
+    def test(self):
+        results = []
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(strict=True)))
+        args = parser.parse_args(args=["-C","tests/test_config.py"])
+        parser.write_snapshot(args, "config_tmp14.mcs")
+        with open("config_tmp14.mcs",'rb') as infile:
+            results.append(infile.read(8)==b"MAGICFG\x00")
+        # matching schema: values used directly
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(strict=True)))
+        results.append(parser.parse_args(args=["-C","config_tmp14.mcs"])==args)
+        results.append(parser.parse_args(args=["-C","config_tmp14.mcs","-b","5"]).bar==5.0)
+        # different schema: values converted again
+        parser.add_argument("--extra", type=int, default=0)
+        parser.remove_argument("-b")
+        parser.add_argument("-b", "--bar", type=int)
+        results.append(parser._get_schema_hash()!=magiconfig._import_config("config_tmp14.mcs", "config").schema)
+        args2 = parser.parse_args(args=["-C","config_tmp14.mcs"])
+        results.append(args2.bar==int(args.bar) and isinstance(args2.bar,int))
+        # flat namespace is not modified
+        flat = magiconfig.FlatMagiConfig(bar = 1.0, config = "unused")
+        parser.write_snapshot(flat, "config_tmp14.mcs")
+        results.append(vars(flat)=={"bar": 1.0, "config": "unused"})
+        os.remove("config_tmp14.mcs")
+        return all(results)
+
+class test_config_watcher(MagiConfigTest):
+    def write_files(self, foo, bar):
+        # imported config file is found in the same directory as this script (and the config file)
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(test_dir,"config_tmp15.py"),'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nbar = {}\n".format(bar))
+        with open(os.path.join(test_dir,"config_tmp16.py"),'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nfrom config_tmp15 import bar\nconfig = MagiConfig(foo = {}, bar = bar)\n".format(repr(foo)))
+        return os.path.join(test_dir,"config_tmp15.py"), os.path.join(test_dir,"config_tmp16.py")
+
+    def test(self):
+        results = []
+        dependency, config_file = self.write_files("lorem", 1.0)
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        parser.add_argument("--extra", type=int, default=0)
+        watcher = magiconfig.ConfigWatcher(parser, config_file, debounce=0)
+        received = []
+        watcher.add_callback(lambda namespace, changes: received.append((namespace, changes)))
+        results.append(watcher.namespace==magiconfig.MagiConfig(foo="lorem", bar=1.0))
+        results.append(not watcher.check())
+        # change in config file
+        self.write_files("ipsum", 1.0)
+        results.append(watcher.check())
+        results.append(received[-1]==(magiconfig.MagiConfig(foo="ipsum", bar=1.0), magiconfig.ConfigChanges([], [], ["foo"])))
+        # change in imported config file
+        self.write_files("ipsum", 20.0)
+        results.append(watcher.check())
+        results.append(received[-1][1]==magiconfig.ConfigChanges([], [], ["bar"]) and watcher.namespace.bar==20.0)
+        # errors keep previous namespace
+        with open(config_file,'a') as outfile:
+            outfile.write("config.extra = 'not an int'\n")
+        results.append(not watcher.check() and watcher.error is not None and watcher.namespace.bar==20.0)
+        os.remove(dependency)
+        os.remove(config_file)
+        return all(results)
+
+class test_config_watcher_parsed(MagiConfigTest):
+    def write_dependency(self, bar):
+        test_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(test_dir,"config_tmp20.py"),'w') as outfile:
+            outfile.write("bar = {}\n".format(bar))
+        return os.path.join(test_dir,"config_tmp20.py")
+
+    def test(self):
+        results = []
+        dependency = self.write_dependency(1.0)
+        config_file = os.path.join(os.path.dirname(dependency),"config_tmp21.py")
+        with open(config_file,'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nfrom config_tmp20 import bar\nconfig = MagiConfig(bar = bar)\nconfig.sub = MagiConfig(x = 1)\n")
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(strict=True)))
+        parser.add_config_argument("sub.x")
+        # file (and its dependency) already imported before the watcher is created
+        args = parser.parse_args(args=["-C",config_file])
+        dependency_module = sys.modules["config_tmp20"]
+        watcher = magiconfig.ConfigWatcher(parser, config_file, debounce=0)
+        results.append(args.bar==1.0 and watcher.namespace.bar==1.0)
+        # only config files are tracked, and other modules are not replaced
+        results.append(list(watcher._dependencies)==["config_tmp20"])
+        self.write_dependency(30.0)
+        results.append(watcher.check() and watcher.error is None and watcher.namespace.bar==30.0 and watcher.namespace.sub.x==1)
+        results.append(sys.modules["magiconfig"] is magiconfig and sys.modules["config_tmp20"] is dependency_module)
+        # config file changed again: reloaded dependency is still used
+        with open(config_file,'a') as outfile:
+            outfile.write("config.sub.x = 2\n")
+        results.append(watcher.check() and watcher.namespace.bar==30.0 and watcher.namespace.sub.x==2)
+        os.remove(dependency)
+        os.remove(config_file)
+        return all(results)
+
+class test_parse_threads(MagiConfigTest):
+    def test(self):
+        import threading
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        parser.add_argument("--extra", type=str, default="")
+        # required -b only provided by test_config.py
+        argv_lists = [
+            (["-C","tests/test_config.py"], 2.0),
+            (["-C","tests/test_config3.py","-b","3"], 3.0),
+            (["-f","x"], None),
+            (["-b","4"], 4.0),
+        ]
+        failures = []
+        def run(offset):
+            for i in range(200):
+                args, bar = argv_lists[(i+offset)%len(argv_lists)]
+                # shared parser, not a copy
+                try:
+                    result = parser.parse_args(args)
+                except argparse.ArgumentError as e:
+                    result = e
+                if bar is None: ok = isinstance(result, argparse.ArgumentError)
+                else: ok = isinstance(result, magiconfig.MagiConfig) and result.bar==bar
+                if not ok: failures.append((args, result))
+        sys.setswitchinterval(1e-6)
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        try:
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        finally:
+            sys.setswitchinterval(0.005)
+        return len(failures)==0 and all(action.required for action in parser._actions if action.dest=="bar")
+
+class test_parse_async(MagiConfigTest):
+    def test(self):
+        if six.PY2: return True
+        import asyncio
+        results = []
+        with open("config_tmp17.py",'w') as outfile:
+            outfile.write("import time\nfrom magiconfig import MagiConfig\ntime.sleep(0.2)\nconfig = MagiConfig(bar = 1.0)\n")
+        with open("config_tmp18.py",'w') as outfile:
+            outfile.write("from magiconfig import MagiConfig\nopen('config_tmp18.txt','w').close()\nconfig = MagiConfig(bar = 2.0)\n")
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            tasks = [parser.parse_args_async(["-C","tests/test_config.py","-f","x{}".format(i)]) for i in range(20)]
+            results.append([args.foo for args in loop.run_until_complete(asyncio.gather(*tasks))]==["x{}".format(i) for i in range(20)])
+            results.append(loop.run_until_complete(parser.parse_config_async("tests/test_config.py", "config", False)).bar==2.0)
+            # one at a time: second call can be cancelled before it starts
+            magiconfig.set_async_concurrency(1)
+            first = parser.parse_args_async(["-C","config_tmp17.py"])
+            second = parser.parse_args_async(["-C","config_tmp18.py"])
+            second.cancel()
+            results.append(loop.run_until_complete(first).bar==1.0)
+            results.append(second.cancelled())
+        finally:
+            magiconfig.set_async_concurrency(None)
+            asyncio.set_event_loop(None)
+            loop.close()
+        results.append(not os.path.exists("config_tmp18.txt"))
+        return all(results)
+
+class test_config_append(MagiConfigTest):
+    def test(self):
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(append=True)))
+        parser.add_argument("--extra", type=str, default=None)
+        args1 = parser.parse_args(args=["-C","tests/test_config.py","-C","tests/test_config5.py"])
+        expected1 = magiconfig.MagiConfig(foo="2", bar=2.0, ipsum=False, extra=None)
+        args2 = parser.parse_args(args=["-C","tests/test_config5.py","--config=tests/test_config3.py","-b","3"])
+        expected2 = magiconfig.MagiConfig(foo="2", bar=3.0, ipsum=False, extra="blah")
+        # positional
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(args=["config"], append=True)))
+        parser.add_argument("--extra", type=str, default=None)
+        args3 = parser.parse_args(args=["tests/test_config3.py","tests/test_config5.py"])
+        expected3 = magiconfig.MagiConfig(foo="2", bar=2.0, ipsum=False, extra=None)
+        return args1==expected1 and args2==expected2 and args3==expected3
+
+class test_config_sweep(MagiConfigTest):
+    def test(self):
+        results = []
+        base = magiconfig.MagiConfig(foo = "lorem", bar = 1.0)
+        base.opt = magiconfig.MagiConfig(lr = 0.1, wd = 0.0)
+        sweep = magiconfig.MagiConfigSweep(base).add_axis("input", ["a","b"]).add_zip([("opt.lr", [1,2,3]), ("opt.wd", [4,5,6])])
+        sweep.add_conditional("model", [
+            ("cnn", magiconfig.MagiConfigSweep(magiconfig.MagiConfig(depth = 3)).add_axis("kernel", [3,5])),
+            ("linear", magiconfig.MagiConfigSweep()),
+        ])
+        results.append(len(sweep)==18)
+        configs = list(sweep)
+        results.extend([
+            configs[0].flatten()==magiconfig.MagiConfig(foo="lorem", bar=1.0, input="a", opt=magiconfig.MagiConfig(lr=1, wd=4), model="cnn", kernel=3, depth=3),
+            configs[2].flatten()==magiconfig.MagiConfig(foo="lorem", bar=1.0, input="a", opt=magiconfig.MagiConfig(lr=1, wd=4), model="linear"),
+            configs[-1].flatten()==sweep[17].flatten()==sweep[-1].flatten(),
+            sweep[17].input=="b" and sweep[17].opt.lr==3 and sweep[17].model=="linear",
+        ])
+        # base is shared, not modified
+        configs[0].opt.lr = 10
+        results.append(base.opt.lr==0.1 and sweep[0].opt.lr==1)
+        try:
+            sweep[18]
+            results.append(False)
+        except IndexError:
+            pass
+        # size without building configs
+        big = magiconfig.MagiConfigSweep(base)
+        for i in range(6):
+            big.add_axis("p{}".format(i), range(10))
+        results.append(len(big)==1000000 and big[123456].p1==2 and big[123456].p5==6)
+        return all(results)
+
+class test_write_many(MagiConfigTest):
+    def test(self):
+        import json
+        results = []
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(obj_args=["-O","--obj"])))
+        base = magiconfig.MagiConfig(foo = "lorem", ipsum = False)
+        sweep = magiconfig.MagiConfigSweep(base).add_axis("bar", [1.0, 2.0, 3.0])
+        index_name = magiconfig.write_many(sweep, "config_tmp19.py", shard_size=2, obj="run", strict=True)
+        with open(index_name) as infile:
+            index = json.load(infile)
+        results.append(index=={"run_0": "config_tmp19_0.py", "run_1": "config_tmp19_0.py", "run_2": "config_tmp19_1.py"})
+        for i,config in enumerate(sweep):
+            args = parser.parse_args(args=["-C",index["run_{}".format(i)],"-O","run_{}".format(i)])
+            results.append(args==config.flatten())
+        # named configs
+        index_name = magiconfig.write_many({"one": base, "two.sub": base}, "config_tmp19.py", strict="file")
+        with open(index_name) as infile:
+            index = json.load(infile)
+        config_mod = magiconfig._load_config_module("config_tmp19_0.py")
+        results.append(index=={"one": "config_tmp19_0.py", "two.sub": "config_tmp19_0.py"} and config_mod.two.sub==base)
+        for filename in [index_name, "config_tmp19_0.py", "config_tmp19_1.py"]:
+            if os.path.exists(filename): os.remove(filename)
+        return all(results)
+
+class test_parse_stats(MagiConfigTest):
+    def test(self):
+        import threading
+        results = []
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions()))
+        parser.parse_args(args=["-C","tests/test_config.py"])
+        results.append(magiconfig.get_parse_stats() is None)
+        parser = make_parser(magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(), profile=True))
+        parser.add_argument("--extra", type=str, default=None)
+        parser.parse_args(args=["-C","tests/test_config3.py"])
+        stats = magiconfig.get_parse_stats()
+        results.extend([
+            list(stats.times)==["scan","load","flatten","convert","check","parse"],
+            stats.total>=sum(stats.times.values())>0,
+            stats.counts["configs"]==1 and stats.counts["keys"]==4 and stats.counts["unknown_attrs"]==0,
+            stats.counts["config_bytes"]==os.path.getsize("tests/test_config3.py"),
+        ])
+        # stats are per thread
+        thread_stats = []
+        def parse():
+            parser.parse_args(args=["-C","tests/test_config.py"])
+            thread_stats.append(magiconfig.get_parse_stats())
+        thread = threading.Thread(target=parse)
+        thread.start()
+        thread.join()
+        results.append(magiconfig.get_parse_stats() is stats and thread_stats[0] is not stats and thread_stats[0].counts["keys"]==3)
+        # global switch, and stats from a failed parse
+        magiconfig.set_profiling(True)
+        try:
+            parser = magiconfig.ArgumentParser(config_options=magiconfig.MagiConfigOptions(strict=True))
+            parser.parse_config("tests/test_config3.py", "config", True)
+            results.append(False)
+        except magiconfig.MagiConfigError:
+            stats = magiconfig.get_parse_stats()
+            results.append(stats.counts["unknown_attrs"]==4 and "check" not in stats.times)
+        finally:
+            magiconfig.set_profiling(False)
+        return all(results)
+
+class test_import_time(MagiConfigTest):
+    def test(self):
+        import subprocess
+        # modules only needed for some features should not be imported by "import magiconfig"
+        lazy = ["uuid", "pickle", "json", "struct", "bisect", "copy", "threading", "importlib.util"]
+        if not six.PY2: lazy.append("six")
+        code = "; ".join([
+            "import sys, time, argparse",
+            "start = time.time()",
+            "import magiconfig",
+            "elapsed = time.time()-start",
+            "print(' '.join(sorted(m for m in {} if m in sys.modules)))".format(repr(lazy)),
+            "print(elapsed)",
+            "print(hasattr(argparse._SubParsersAction, 'add_parser_orig'))",
+        ])
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.getcwd()]+sys.path))
+        output = subprocess.check_output([sys.executable, "-c", code], env=env).decode().split("\n")
+        # budget for magiconfig itself (argparse and the interpreter excluded), generous for slow machines
+        # argparse is only modified for python 2
+        return output[0]=="" and float(output[1])<0.1 and output[2]==str(six.PY2)
+
 if __name__=="__main__":
     tests = OrderedDict([(subcl.__name__, subcl) for subcl in MagiConfigTest.__subclasses__()])
     successful = []